@@ -1,9 +1,12 @@
 """
 Use cases for the Vanna AI application.
 """
+import asyncio
 import time
 from typing import List, Optional
 
+from loguru import logger
+
 from ..domain.entities import QueryRequest, QueryResponse, HealthStatus
 from ..domain.repositories import QueryRepository, VannaRepository, DatabaseRepository
 
@@ -37,37 +40,37 @@ class ProcessQueryUseCase:
             ValueError: If question is invalid
             RuntimeError: If any step fails
         """
-        from loguru import logger
-        
-        logger.info(f"USE CASE: Starting query processing workflow")
-        logger.info(f"Question: '{question}'")
-        logger.info(f"User ID: {user_id or 'default'}")
+        logger.debug("USE CASE: Starting query processing workflow")
+        logger.debug("Question: '{}'", question)
+        logger.debug("User ID: {}", user_id or "default")
         
         # Create and validate query request
         query_request = QueryRequest(question=question, user_id=user_id)
-        logger.info(f"Query request created")
+        logger.debug("Query request created")
         
         # Save the query request
         query_id = await self.query_repo.save_query(query_request)
-        logger.info(f"Query saved with ID: {query_id}")
+        logger.debug("Query saved with ID: {}", query_id)
         
         try:
             # Generate SQL using Vanna AI
-            logger.info(f"Step 1: Generating SQL using Vanna AI")
-            start_time = time.time()
+            logger.debug("Step 1: Generating SQL using Vanna AI")
+            start_ns = time.perf_counter_ns()
             sql_query = await self.vanna_repo.generate_sql(question)
-            vanna_time = (time.time() - start_time) * 1000
-            logger.info(f"SQL generation completed in {vanna_time:.2f}ms")
+            vanna_ns = time.perf_counter_ns() - start_ns
+            vanna_time = vanna_ns / 1e6
+            logger.debug("SQL generation completed in {:.2f}ms", vanna_time)
             
             # Execute the generated SQL
-            logger.info(f"Step 2: Executing SQL query")
-            start_time = time.time()
+            logger.debug("Step 2: Executing SQL query")
+            start_ns = time.perf_counter_ns()
             results, execution_time = await self.db_repo.execute_query(sql_query)
-            db_time = (time.time() - start_time) * 1000
-            logger.info(f"SQL execution completed in {db_time:.2f}ms")
+            db_ns = time.perf_counter_ns() - start_ns
+            db_time = db_ns / 1e6
+            logger.debug("SQL execution completed in {:.2f}ms", db_time)
             
             # Create response
-            total_time = vanna_time + db_time
+            total_time = (vanna_ns + db_ns) / 1e6
             response = QueryResponse(
                 sql_query=sql_query,
                 results=results,
@@ -75,22 +78,22 @@ class ProcessQueryUseCase:
                 row_count=len(results),
             )
             
-            logger.info(f"Response created:")
-            logger.info(f"SQL: '{sql_query}'")
-            logger.info(f"Rows: {len(results)}")
-            logger.info(f"Total time: {total_time:.2f}ms")
+            logger.debug("Response created:")
+            logger.debug("SQL: '{}'", sql_query)
+            logger.debug("Rows: {}", response.row_count)
+            logger.debug("Total time: {:.2f}ms", total_time)
             
             # Save the response
-            logger.info(f"Step 3: Saving response to repository")
+            logger.debug("Step 3: Saving response to repository")
             await self.query_repo.save_response(query_id, response)
-            logger.info(f"Response saved successfully")
+            logger.debug("Response saved successfully")
             
-            logger.info(f"Query processing workflow completed successfully")
+            logger.debug("Query processing workflow completed successfully")
             return response
             
         except Exception as e:
-            logger.error(f"Query processing workflow failed: {e}")
-            logger.error(f"Error type: {type(e).__name__}")
+            logger.error("Query processing workflow failed: {}", e)
+            logger.error("Error type: {}", type(e).__name__)
             
             # Create error response
             error_response = QueryResponse(
@@ -104,9 +107,9 @@ class ProcessQueryUseCase:
             # Save error response
             try:
                 await self.query_repo.save_response(query_id, error_response)
-                logger.info(f"Error response saved to repository")
+                logger.debug("Error response saved to repository")
             except Exception as save_error:
-                logger.error(f"Failed to save error response: {save_error}")
+                logger.error("Failed to save error response: {}", save_error)
             
             raise RuntimeError(f"Failed to process query: {str(e)}") from e
 
@@ -132,31 +135,28 @@ class HealthCheckUseCase:
         Returns:
             HealthStatus with current health information
         """
-        from loguru import logger
-        
-        logger.info(f"🏥 HEALTH CHECK: Starting health check")
-        logger.info(f"   📋 Version: {self.version}")
+        logger.debug("🏥 HEALTH CHECK: Starting health check")
+        logger.debug("   📋 Version: {}", self.version)
         
-        # Check Vanna AI connection
-        logger.info(f"   🤖 Checking Vanna AI connection...")
-        vanna_connected = await self.vanna_repo.check_connection()
-        logger.info(f"   🤖 Vanna AI connection: {'Connected' if vanna_connected else 'Disconnected'}")
-        
-        # Check database connection
-        logger.info(f"   🗄️  Checking database connection...")
-        db_connected = await self.db_repo.check_connection()
-        logger.info(f"   🗄️  Database connection: {'Connected' if db_connected else 'Disconnected'}")
+        # Check Vanna AI and database connections concurrently
+        logger.debug("   🔌 Checking Vanna AI and database connections...")
+        vanna_connected, db_connected = await asyncio.gather(
+            self.vanna_repo.check_connection(),
+            self.db_repo.check_connection(),
+        )
+        logger.debug("   🤖 Vanna AI connection: {}", "Connected" if vanna_connected else "Disconnected")
+        logger.debug("   🗄️  Database connection: {}", "Connected" if db_connected else "Disconnected")
         
         # Determine overall status
         if vanna_connected and db_connected:
             status = "healthy"
-            logger.info(f"Overall status: HEALTHY")
+            logger.debug("Overall status: HEALTHY")
         elif not vanna_connected and not db_connected:
             status = "unhealthy"
-            logger.error(f"Overall status: UNHEALTHY")
+            logger.error("Overall status: UNHEALTHY")
         else:
             status = "degraded"
-            logger.warning(f"Overall status: DEGRADED")
+            logger.warning("Overall status: DEGRADED")
         
         health_status = HealthStatus(
             status=status,
@@ -166,10 +166,10 @@ class HealthCheckUseCase:
             vanna_connected=vanna_connected,
         )
         
-        logger.info(f"Health check summary:")
-        logger.info(f"Status: {health_status.status}")
-        logger.info(f"Vanna: {health_status.vanna_connected}")
-        logger.info(f"Database: {health_status.database_connected}")
-        logger.info(f"Timestamp: {health_status.timestamp}")
+        logger.debug("Health check summary:")
+        logger.debug("Status: {}", health_status.status)
+        logger.debug("Vanna: {}", health_status.vanna_connected)
+        logger.debug("Database: {}", health_status.database_connected)
+        logger.debug("Timestamp: {}", health_status.timestamp)
         
         return health_status
@@ -1,29 +1,38 @@
 """
 Core domain entities for the Vanna AI application.
 """
-from dataclasses import dataclass
-from datetime import datetime
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
+# dataclass(slots=True) is only available on Python 3.10+
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
 
-@dataclass
+_VALID_STATUSES = frozenset({"healthy", "unhealthy", "degraded"})
+
+
+@dataclass(frozen=True, **_SLOTS)
 class QueryRequest:
     """Domain entity representing a natural language query request."""
     
     question: str
     user_id: Optional[str] = None
-    timestamp: Optional[datetime] = None
+    created_ns: int = field(default_factory=time.time_ns, repr=False, compare=False)
     
     def __post_init__(self) -> None:
         """Validate the question field."""
         if not self.question or not self.question.strip():
             raise ValueError("Question cannot be empty")
-        
-        if self.timestamp is None:
-            self.timestamp = datetime.utcnow()
+    
+    @property
+    def timestamp(self) -> datetime:
+        """Creation time in UTC, built from created_ns only when read."""
+        return datetime.fromtimestamp(self.created_ns / 1e9, tz=timezone.utc)
 
 
-@dataclass
+@dataclass(frozen=True, **_SLOTS)
 class QueryResponse:
     """Domain entity representing a query response with SQL and results."""
     
@@ -45,7 +54,7 @@ class QueryResponse:
             raise ValueError("Row count cannot be negative")
 
 
-@dataclass
+@dataclass(frozen=True, **_SLOTS)
 class HealthStatus:
     """Domain entity representing application health status."""
     
@@ -57,8 +66,8 @@ class HealthStatus:
     
     def __post_init__(self) -> None:
         """Validate the health status fields."""
-        if self.status not in ["healthy", "unhealthy", "degraded"]:
+        if self.status not in _VALID_STATUSES:
             raise ValueError("Status must be one of: healthy, unhealthy, degraded")
         
         if self.timestamp is None:
-            self.timestamp = datetime.utcnow()
+            object.__setattr__(self, "timestamp", datetime.now(timezone.utc))
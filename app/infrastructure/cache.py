@@ -0,0 +1,114 @@
+"""
+Small in-process caches used by the infrastructure layer.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Generic, Hashable, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """OrderedDict-backed LRU cache with hit/miss counters and optional TTL."""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None) -> None:
+        """Initialize an empty cache holding at most ``maxsize`` entries.
+
+        When ``ttl`` is given, entries expire ``ttl`` seconds after being set.
+        """
+        self._data: "OrderedDict[K, V]" = OrderedDict()
+        self._expires_at: Dict[K, float] = {}
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _expired(self, key: K) -> bool:
+        """Drop key and return True if its TTL has elapsed."""
+        if self._ttl is None or self._expires_at.get(key, float("inf")) > time.monotonic():
+            return False
+        self._data.pop(key, None)
+        self._expires_at.pop(key, None)
+        return True
+
+    def get(self, key: K) -> Optional[V]:
+        """Return the cached value for key (marking it recently used), or None."""
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        if self._expired(key):
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def peek(self, key: K) -> Optional[V]:
+        """Return the cached value without touching recency or counters."""
+        if key not in self._data or self._expired(key):
+            return None
+        return self._data[key]
+
+    def set(self, key: K, value: V) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if self._ttl is not None:
+            self._expires_at[key] = time.monotonic() + self._ttl
+        if len(self._data) > self._maxsize:
+            evicted, _ = self._data.popitem(last=False)
+            self._expires_at.pop(evicted, None)
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        self._data.clear()
+        self._expires_at.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return size and hit/miss counters."""
+        return {
+            "size": len(self._data),
+            "maxsize": self._maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class KeyedLocks(Generic[K]):
+    """Per-key asyncio locks for single-flight work, dropped once nobody needs them."""
+
+    def __init__(self) -> None:
+        """Initialize with no locks."""
+        self._locks: Dict[K, asyncio.Lock] = {}
+        self._users: Dict[K, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: K) -> AsyncIterator[None]:
+        """Hold the lock for key; concurrent holders of the same key run one at a time."""
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        # Count waiters as well as the holder, so the lock is only discarded
+        # when no coroutine can still be queued on it
+        self._users[key] = self._users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            remaining = self._users[key] - 1
+            if remaining:
+                self._users[key] = remaining
+            else:
+                del self._users[key]
+                del self._locks[key]
+
+    def __len__(self) -> int:
+        return len(self._locks)
@@ -2,9 +2,10 @@
 Configuration management for the Vanna AI application.
 """
 import os
+from functools import lru_cache
 from typing import Optional
 
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
 
@@ -34,6 +35,10 @@ class Settings(BaseSettings):
     local_vanna_server_url: str = Field(default="http://localhost:8001", env="LOCAL_VANNA_SERVER_URL")
     local_vanna_timeout: int = Field(default=30, env="LOCAL_VANNA_TIMEOUT")
     local_vanna_max_retries: int = Field(default=3, env="LOCAL_VANNA_MAX_RETRIES")
+    rag_max_chars: int = Field(default=8000, env="RAG_MAX_CHARS")
+    
+    # Qdrant settings (gRPC needs port 6334 published alongside 6333)
+    qdrant_prefer_grpc: bool = Field(default=False, env="QDRANT_PREFER_GRPC")
     
     # Vanna AI settings
     vanna_api_key: Optional[str] = Field(default="vn-3382b82aaf534991a546dec6cc2c72c5", env="VANNA_API_KEY")
@@ -49,12 +54,20 @@ class Settings(BaseSettings):
         env="LOG_FORMAT"
     )
     
-    class Config:
-        """Pydantic configuration."""
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        case_sensitive = False
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        case_sensitive=False,
+        frozen=True,
+        extra="ignore",
+    )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide settings, parsing the environment only once."""
+    return Settings()
 
 
 # Global settings instance
-settings = Settings()
+settings = get_settings()
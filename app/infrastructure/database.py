@@ -1,14 +1,99 @@
 """
 Database infrastructure and repository implementation.
 """
+import asyncio
+import atexit
+import os
+import threading
 import time
 import sqlite3
 from typing import Any, Dict, List, Optional
 from pathlib import Path
 
+from loguru import logger
+
 from ..domain.repositories import DatabaseRepository
 from .config import settings
 
+# Per-connection tuning; journal_mode=WAL is persistent in the file and set at initialization
+_CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+)
+
+# Application schema, run as a single script on initialization
+_SCHEMA_DDL = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    is_active INTEGER DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS employees (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    department TEXT,
+    salary REAL,
+    hire_date TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS sales (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_name TEXT NOT NULL,
+    amount REAL NOT NULL,
+    sale_date TEXT NOT NULL,
+    customer_id INTEGER,
+    employee_id INTEGER,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_name TEXT NOT NULL,
+    total_amount REAL NOT NULL,
+    status TEXT DEFAULT 'pending',
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# Sample data seeded on initialization
+_SAMPLE_USERS = (
+    ("john_doe", "john.doe@example.com"),
+    ("jane_smith", "jane.smith@example.com"),
+    ("bob_wilson", "bob.wilson@example.com"),
+    ("alice_brown", "alice.brown@example.com"),
+    ("charlie_davis", "charlie.davis@example.com"),
+)
+
+_SAMPLE_EMPLOYEES = (
+    ("John", "Doe", "john.doe@company.com", "Engineering", 75000.00, "2022-02-15"),
+    ("Jane", "Smith", "jane.smith@company.com", "Marketing", 65000.00, "2022-03-20"),
+    ("Bob", "Wilson", "bob.wilson@company.com", "Sales", 70000.00, "2021-12-10"),
+    ("Alice", "Brown", "alice.brown@company.com", "Engineering", 80000.00, "2021-09-05"),
+    ("Charlie", "Davis", "charlie.davis@company.com", "HR", 60000.00, "2022-04-01"),
+)
+
+_SAMPLE_SALES = (
+    ("Laptop", 1200.00, "2024-01-15", 1, 3),
+    ("Mouse", 25.00, "2024-01-16", 2, 3),
+    ("Keyboard", 80.00, "2024-01-17", 3, 3),
+    ("Monitor", 300.00, "2024-01-18", 1, 3),
+    ("Headphones", 150.00, "2024-01-19", 4, 3),
+)
+
+_SAMPLE_ORDERS = (
+    ("Acme Corp", 1500.00, "completed"),
+    ("Tech Solutions", 800.00, "processing"),
+    ("Global Industries", 2200.00, "pending"),
+    ("Startup Inc", 450.00, "completed"),
+    ("Enterprise Ltd", 3200.00, "processing"),
+)
+
 
 class DatabaseManager:
     """Manages database connections and provides repository instances."""
@@ -17,6 +102,49 @@ class DatabaseManager:
         """Initialize the database manager."""
         self._initialized = False
         self._db_path = self._get_db_path()
+        # One cached connection per worker thread, tracked so they can be closed at exit
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+    
+    def _connect(self, read_only: bool = False, **kwargs: Any) -> sqlite3.Connection:
+        """Open a SQLite connection with the standard PRAGMAs applied."""
+        if read_only:
+            uri = f"{Path(self._db_path).resolve().as_uri()}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, **kwargs)
+        else:
+            conn = sqlite3.connect(self._db_path, **kwargs)
+        for pragma in _CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    def _enable_wal(self) -> None:
+        """Switch the database file to write-ahead logging (creates -wal/-shm files)."""
+        conn = sqlite3.connect(self._db_path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+        finally:
+            conn.close()
+    
+    def get_read_connection(self) -> sqlite3.Connection:
+        """Return the calling thread's cached read-only SQLite connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # check_same_thread=False only so close() can run from the atexit thread
+            conn = self._connect(read_only=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+    
+    def close(self) -> None:
+        """Close all cached connections."""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
     
     def _get_db_path(self) -> str:
         """Get the database file path."""
@@ -28,33 +156,77 @@ class DatabaseManager:
         else:
             return "vanna_app_clean.db"
     
-    async def initialize_database(self) -> None:
-        """Initialize the database with tables and sample data."""
-        from loguru import logger
-        import os
+    def _schema_exists(self) -> bool:
+        """Check whether the application tables have already been created."""
+        conn = sqlite3.connect(self._db_path)
+        try:
+            row = conn.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type='table' AND name='users'"
+            ).fetchone()
+            return row[0] > 0
+        finally:
+            conn.close()
+    
+    async def initialize_database(self, reset: bool = False) -> None:
+        """
+        Initialize the database with tables and sample data.
+        
+        Initialization is idempotent: an existing database is reused as-is.
         
-        if self._initialized:
+        Args:
+            reset: Delete any existing database file and re-create it from scratch
+        """
+        if self._initialized and not reset:
             return
-            
+        
+        # All of the work below is blocking sqlite3/file I/O; keep it off the event loop
+        await asyncio.to_thread(self._initialize_database, reset)
+    
+    def _initialize_database(self, reset: bool) -> None:
+        """Blocking body of initialize_database, run on a worker thread."""
         try:
             logger.info(f"🗄️  DATABASE: Starting initialization")
             logger.info(f"   📁 Database path: {self._db_path}")
             
-            # Force delete any existing corrupted database
-            if os.path.exists(self._db_path):
-                logger.info(f"   🗑️  Removing existing database file")
-                os.remove(self._db_path)
-                logger.info(f"   ✅ Existing database file removed")
+            if reset:
+                logger.info(f"   🗑️  Reset requested, removing existing database files")
+                self.close()
+                for path in (self._db_path, f"{self._db_path}-wal", f"{self._db_path}-shm"):
+                    if os.path.exists(path):
+                        os.remove(path)
+                logger.info(f"   ✅ Existing database files removed")
+            
+            # Use write-ahead logging so readers don't block on writers
+            self._enable_wal()
             
-            # Create tables first
-            logger.info(f"   📋 Step 1: Creating database tables")
-            self._create_tables()
-            logger.info(f"   ✅ Tables created successfully")
+            if self._schema_exists():
+                logger.info(f"   ♻️  Existing database found, skipping table creation and seeding")
+                self._initialized = True
+                return
             
-            # Insert sample data
-            logger.info(f"   📊 Step 2: Inserting sample data")
-            self._insert_sample_data()
-            logger.info(f"   ✅ Sample data inserted successfully")
+            # Create tables and insert sample data in one explicit transaction,
+            # so DDL doesn't autocommit (and fsync) statement by statement
+            conn = self._connect(isolation_level=None)
+            cursor = conn.cursor()
+            try:
+                # executescript commits any open transaction before running,
+                # so the BEGIN has to be part of the script itself
+                logger.info(f"   📋 Step 1: Creating database tables")
+                cursor.executescript(f"BEGIN IMMEDIATE;\n{_SCHEMA_DDL}")
+                logger.info(f"   ✅ Tables created successfully")
+                
+                logger.info(f"   📊 Step 2: Inserting sample data")
+                self._insert_sample_data(cursor)
+                logger.info(f"   ✅ Sample data inserted successfully")
+                
+                cursor.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    cursor.execute("ROLLBACK")
+                raise
+            finally:
+                cursor.close()
+                conn.close()
             
             self._initialized = True
             logger.info(f"   🎉 Database initialization completed successfully")
@@ -71,10 +243,8 @@ class DatabaseManager:
     
     def _test_database(self) -> None:
         """Test basic database functionality."""
-        from loguru import logger
-        
         try:
-            conn = sqlite3.connect(self._db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # Test basic query
@@ -93,136 +263,37 @@ class DatabaseManager:
             logger.error(f"      ❌ Database test failed: {e}")
             raise
     
-    def _create_tables(self) -> None:
-        """Create database tables using native sqlite3."""
-        from loguru import logger
+    def _insert_sample_data(self, cursor: sqlite3.Cursor) -> None:
+        """Insert sample data into tables using the caller's transaction."""
+        logger.info(f"      📊 Inserting sample data...")
         
-        logger.info(f"      🚀 Creating tables...")
+        logger.info(f"         👥 Inserting {len(_SAMPLE_USERS)} sample users")
+        cursor.executemany(
+            "INSERT INTO users (username, email) VALUES (?, ?)",
+            _SAMPLE_USERS,
+        )
         
-        # Create each table individually
-        tables = [
-            ("users", """
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT UNIQUE NOT NULL,
-                    email TEXT UNIQUE NOT NULL,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    is_active INTEGER DEFAULT 1
-                )
-            """),
-            ("employees", """
-                CREATE TABLE IF NOT EXISTS employees (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    first_name TEXT NOT NULL,
-                    last_name TEXT NOT NULL,
-                    email TEXT UNIQUE NOT NULL,
-                    department TEXT,
-                    salary REAL,
-                    hire_date TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            """),
-            ("sales", """
-                CREATE TABLE IF NOT EXISTS sales (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    product_name TEXT NOT NULL,
-                    amount REAL NOT NULL,
-                    sale_date TEXT NOT NULL,
-                    customer_id INTEGER,
-                    employee_id INTEGER,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            """),
-            ("orders", """
-                CREATE TABLE IF NOT EXISTS orders (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    customer_name TEXT NOT NULL,
-                    total_amount REAL NOT NULL,
-                    status TEXT DEFAULT 'pending',
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-        ]
+        logger.info(f"         👷 Inserting {len(_SAMPLE_EMPLOYEES)} sample employees")
+        cursor.executemany(
+            "INSERT INTO employees (first_name, last_name, email, department, salary, hire_date) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            _SAMPLE_EMPLOYEES,
+        )
         
-        # Connect and create tables
-        conn = sqlite3.connect(self._db_path)
-        cursor = conn.cursor()
+        logger.info(f"         💰 Inserting {len(_SAMPLE_SALES)} sample sales")
+        cursor.executemany(
+            "INSERT INTO sales (product_name, amount, sale_date, customer_id, employee_id) "
+            "VALUES (?, ?, ?, ?, ?)",
+            _SAMPLE_SALES,
+        )
         
-        try:
-            for table_name, create_sql in tables:
-                logger.info(f"      📋 Creating table: {table_name}")
-                cursor.execute(create_sql)
-                logger.info(f"      ✅ Table {table_name} created successfully")
-            
-            conn.commit()
-            logger.info(f"      🎉 All tables created successfully")
-            
-        finally:
-            cursor.close()
-            conn.close()
-    
-    def _insert_sample_data(self) -> None:
-        """Insert sample data into tables."""
-        from loguru import logger
-        
-        logger.info(f"      📊 Inserting sample data...")
-        
-        # Connect and insert data
-        conn = sqlite3.connect(self._db_path)
-        cursor = conn.cursor()
+        logger.info(f"         📦 Inserting {len(_SAMPLE_ORDERS)} sample orders")
+        cursor.executemany(
+            "INSERT INTO orders (customer_name, total_amount, status) VALUES (?, ?, ?)",
+            _SAMPLE_ORDERS,
+        )
         
-        try:
-            # Insert sample users
-            logger.info(f"         👥 Inserting 5 sample users")
-            cursor.execute("""
-                INSERT INTO users (username, email) VALUES
-                ('john_doe', 'john.doe@example.com'),
-                ('jane_smith', 'jane.smith@example.com'),
-                ('bob_wilson', 'bob.wilson@example.com'),
-                ('alice_brown', 'alice.brown@example.com'),
-                ('charlie_davis', 'charlie.davis@example.com')
-            """)
-            
-            # Insert sample employees
-            logger.info(f"         👷 Inserting 5 sample employees")
-            cursor.execute("""
-                INSERT INTO employees (first_name, last_name, email, department, salary, hire_date) VALUES
-                ('John', 'Doe', 'john.doe@company.com', 'Engineering', 75000.00, '2022-02-15'),
-                ('Jane', 'Smith', 'jane.smith@company.com', 'Marketing', 65000.00, '2022-03-20'),
-                ('Bob', 'Wilson', 'bob.wilson@company.com', 'Sales', 70000.00, '2021-12-10'),
-                ('Alice', 'Brown', 'alice.brown@company.com', 'Engineering', 80000.00, '2021-09-05'),
-                ('Charlie', 'Davis', 'charlie.davis@company.com', 'HR', 60000.00, '2022-04-01')
-            """)
-            
-            # Insert sample sales
-            logger.info(f"         💰 Inserting 5 sample sales")
-            cursor.execute("""
-                INSERT INTO sales (product_name, amount, sale_date, customer_id, employee_id) VALUES
-                ('Laptop', 1200.00, '2024-01-15', 1, 3),
-                ('Mouse', 25.00, '2024-01-16', 2, 3),
-                ('Keyboard', 80.00, '2024-01-17', 3, 3),
-                ('Monitor', 300.00, '2024-01-18', 1, 3),
-                ('Headphones', 150.00, '2024-01-19', 4, 3)
-            """)
-            
-            # Insert sample orders
-            logger.info(f"         📦 Inserting 5 sample orders")
-            cursor.execute("""
-                INSERT INTO orders (customer_name, total_amount, status) VALUES
-                ('Acme Corp', 1500.00, 'completed'),
-                ('Tech Solutions', 800.00, 'processing'),
-                ('Global Industries', 2200.00, 'pending'),
-                ('Startup Inc', 450.00, 'completed'),
-                ('Enterprise Ltd', 3200.00, 'processing')
-            """)
-            
-            conn.commit()
-            logger.info(f"      ✅ Sample data inserted successfully")
-            
-        finally:
-            cursor.close()
-            conn.close()
+        logger.info(f"      ✅ Sample data inserted successfully")
     
     async def check_connection(self) -> bool:
         """Check if the database is accessible."""
@@ -231,15 +302,19 @@ class DatabaseManager:
             if not self._initialized:
                 await self.initialize_database()
                 
-            # Test connection with native SQLite
-            conn = sqlite3.connect(self._db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.close()
-            conn.close()
+            # Test connection with native SQLite on a worker thread
+            await asyncio.to_thread(self._ping)
             return True
         except Exception:
             return False
+    
+    def _ping(self) -> None:
+        """Open a connection and run a trivial query."""
+        conn = self._connect()
+        try:
+            conn.execute("SELECT 1").close()
+        finally:
+            conn.close()
 
 
 class SQLiteDatabaseRepository(DatabaseRepository):
@@ -262,55 +337,48 @@ class SQLiteDatabaseRepository(DatabaseRepository):
         Raises:
             Exception: If query execution fails
         """
-        from loguru import logger
-        
-        logger.info(f"🗄️  DATABASE: Executing SQL query")
-        logger.info(f"   🎯 SQL: '{sql}'")
+        logger.debug("🗄️  DATABASE: Executing SQL: '{}'", sql)
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
-            # Use native SQLite for query execution
-            conn = sqlite3.connect(self.db_manager._db_path)
-            cursor = conn.cursor()
-            
-            logger.info(f"   🔌 Database connection established")
-            
-            cursor.execute(sql)
-            logger.info(f"   ✅ SQL executed successfully")
+            # Run the blocking sqlite3 call on a worker thread so the event loop stays free
+            results, columns = await asyncio.to_thread(self._run_query, sql)
             
-            # Get column names from cursor description
-            if cursor.description:
-                columns = [desc[0] for desc in cursor.description]
-            else:
-                columns = []
+            execution_time = (time.perf_counter() - start_time) * 1000
             
-            # Fetch all results
-            rows = cursor.fetchall()
-            results = [dict(zip(columns, row)) for row in rows]
-            
-            execution_time = (time.time() - start_time) * 1000
-            
-            logger.info(f"   📊 Query results:")
-            logger.info(f"      📋 Columns: {columns}")
-            logger.info(f"      📈 Row count: {len(results)}")
-            logger.info(f"      ⏱️  Execution time: {execution_time:.2f}ms")
-            
-            if results:
-                logger.info(f"      📝 Sample result: {results[0] if len(results) > 0 else 'No results'}")
-            
-            cursor.close()
-            conn.close()
+            logger.debug(
+                "   📊 Query returned {} rows, columns {} in {:.2f}ms",
+                len(results), columns, execution_time
+            )
             
             return results, execution_time
                 
         except Exception as e:
-            execution_time = (time.time() - start_time) * 1000
+            execution_time = (time.perf_counter() - start_time) * 1000
             logger.error(f"   ❌ Database query failed: {e}")
             logger.error(f"   📋 Error type: {type(e).__name__}")
             logger.error(f"   ⏱️  Failed after: {execution_time:.2f}ms")
             raise Exception(f"Query execution failed: {str(e)}") from e
     
+    def _run_query(self, sql: str) -> tuple[List[Dict[str, Any]], List[str]]:
+        """Execute a query with native SQLite and return (rows, column names)."""
+        conn = self.db_manager.get_read_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(sql)
+            
+            # Column names come from the description so they are known even for empty results
+            columns = [desc[0] for desc in cursor.description] if cursor.description else []
+            
+            # sqlite3.Row converts straight to a dict without a per-row zip
+            return [dict(row) for row in cursor.fetchall()], columns
+        finally:
+            cursor.close()
+            # The connection is reused, so never leave a transaction open on it
+            if conn.in_transaction:
+                conn.rollback()
+    
     async def check_connection(self) -> bool:
         """Check if the database is accessible."""
         return await self.db_manager.check_connection()
@@ -318,3 +386,7 @@ class SQLiteDatabaseRepository(DatabaseRepository):
 
 # Global database manager instance
 db_manager = DatabaseManager()
+atexit.register(db_manager.close)
+
+# Global database repository instance (stateless, safe to share across requests)
+db_repository = SQLiteDatabaseRepository(db_manager)
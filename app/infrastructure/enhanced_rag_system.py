@@ -3,15 +3,71 @@ Enhanced RAG System with Qdrant Integration
 Properly connects to the existing Qdrant vector database
 """
 
+import asyncio
+import hashlib
 import sqlite3
 import re
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from loguru import logger
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, VectorParams, PointStruct, SearchRequest
 import numpy as np
 
+from app.infrastructure.cache import LRUCache
+from app.infrastructure.config import settings
+
+# Dimension of the vectors stored in the Qdrant collection
+VECTOR_SIZE = 384
+
+# Sentence-transformer model producing VECTOR_SIZE-dimensional embeddings
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+# Suffix of the collection holding the schema points embedded with EMBEDDING_MODEL
+_EMBEDDED_COLLECTION_SUFFIX = "_minilm"
+
+# Keyword weights for the hash-based vector; the i-th keyword fills slot i
+_KEYWORDS = (
+    'user', 'users', 'order', 'orders', 'count',
+    'sales', 'employee', 'employees', 'customer',
+    'table', 'column', 'schema'
+)
+_KEYWORD_WEIGHTS = np.array(
+    [0.1, 0.1, 0.2, 0.2, 0.3, 0.4, 0.5, 0.5, 0.6, 0.7, 0.8, 0.9],
+    dtype=np.float32
+)
+
+# Table-level payload: "Table: <name>\n...Description: <desc>Columns: ..."
+_TABLE_RE = re.compile(r"Table: (?P<name>[^\n]*).*?Description: (?P<desc>.*?)(?:Columns:|\Z)", re.S)
+
+# Parameterized column lookup (PRAGMA statements themselves cannot bind arguments)
+_TABLE_COLUMNS_SQL = "SELECT name FROM pragma_table_info(?)"
+
+
+@lru_cache(maxsize=1024)
+def _simple_vector(text: str) -> Tuple[float, ...]:
+    """Hash/keyword vector for text, cached because questions repeat"""
+    vector = np.zeros(VECTOR_SIZE, dtype=np.float32)
+    
+    # Normalize text
+    text_lower = text.lower()
+    
+    # Fill vector based on keywords
+    present = np.fromiter((keyword in text_lower for keyword in _KEYWORDS), dtype=bool, count=len(_KEYWORDS))
+    vector[:len(_KEYWORDS)] = np.where(present, _KEYWORD_WEIGHTS, 0.0)
+    
+    # Add text hash variation (one digest byte in every even slot of the first 32)
+    digest = hashlib.md5(text.encode()).digest()
+    vector[0:2 * len(digest):2] = np.frombuffer(digest, dtype=np.uint8) / 255.0
+    
+    # Add character-based variation (code points of the first VECTOR_SIZE chars)
+    codes = np.frombuffer(text_lower[:VECTOR_SIZE].encode('utf-32-le', 'surrogatepass'), dtype='<u4')
+    n = len(codes)
+    vector[:n] = (vector[:n] + codes / 128.0) / 2
+    
+    return tuple(vector.tolist())
+
 @dataclass
 class SchemaContext:
     """Schema context information"""
@@ -32,21 +88,32 @@ class EnhancedRAGSystem:
         self._is_available = False
         self.vector_db = None
         self.collection_name = "database_schema"
+        # Written only by build_embedding_index(); searched when it matches collection_name
+        self.embedded_collection_name = self.collection_name + _EMBEDDED_COLLECTION_SUFFIX
+        self._search_collection = self.collection_name
+        self._schema_context_cache: Optional[str] = None
+        self._all_points: List[Any] = []
+        self._table_schemas: Dict[str, str] = {}
+        self._column_details: List[str] = []
+        self._encoder = None
+        self._embedding_cache: LRUCache[str, Tuple[float, ...]] = LRUCache(maxsize=1024)
         
     async def initialize(self) -> bool:
         """Initialize the enhanced RAG system with Qdrant connection"""
         logger.info("🔧 ENHANCED RAG: Initializing with Qdrant connection")
+        self.invalidate_schema_cache()
         
         try:
-            # Connect to Qdrant Docker server
+            # Connect to Qdrant Docker server; gRPC (protobuf, packed float vectors) is opt-in
             self.vector_db = QdrantClient(
                 host="localhost",
                 port=6333,
-                prefer_grpc=False
+                grpc_port=6334,
+                prefer_grpc=settings.qdrant_prefer_grpc
             )
             
             # Check if collection exists
-            collections = self.vector_db.get_collections()
+            collections = await asyncio.to_thread(self.vector_db.get_collections)
             collection_exists = any(col.name == self.collection_name for col in collections.collections)
             
             if not collection_exists:
@@ -54,13 +121,25 @@ class EnhancedRAGSystem:
                 return False
             
             # Get collection info
-            collection_info = self.vector_db.get_collection(self.collection_name)
+            collection_info = await asyncio.to_thread(self.vector_db.get_collection, self.collection_name)
             logger.info(f"✅ ENHANCED RAG: Connected to collection '{self.collection_name}'")
             logger.info(f"   Points count: {collection_info.points_count}")
             logger.info(f"   Vector size: {collection_info.config.params.vectors.size}")
             
-            # Also extract schema info for fallback
-            await self._extract_schema_info()
+            # Load the (small) schema collection once so the hot path never scrolls
+            await asyncio.to_thread(self._load_points, collection_info.points_count or 0)
+            
+            # Search with real embeddings only when the embedded collection is in sync
+            # with the schema points; otherwise use hash vectors against the main collection
+            encoder = None
+            if await self._embedded_collection_in_sync(collections):
+                encoder = await asyncio.to_thread(self._load_encoder)
+            self._encoder = encoder
+            self._search_collection = self.embedded_collection_name if encoder is not None else self.collection_name
+            self._embedding_cache.clear()
+            
+            # Also extract schema info for fallback (blocking SQLite work, so off the loop)
+            await asyncio.to_thread(self._extract_schema_info)
             
             self._is_available = True
             logger.info(f"✅ ENHANCED RAG: Initialized successfully with {len(self.schema_contexts)} table contexts")
@@ -71,11 +150,111 @@ class EnhancedRAGSystem:
             self._is_available = False
             return False
     
+    def _load_points(self, points_count: int) -> None:
+        """Scroll the whole collection once and index the schema payloads in memory"""
+        points, _ = self.vector_db.scroll(
+            collection_name=self.collection_name,
+            limit=max(points_count, 1),
+            with_payload=True
+        )
+        self._all_points = list(points)
+        
+        texts = [p.payload['text'] for p in self._all_points if p.payload and 'text' in p.payload]
+        
+        # Parse table-level descriptions in a single regex pass
+        table_match = _TABLE_RE.match
+        matches = [(text, table_match(text)) for text in texts]
+        table_schemas: Dict[str, str] = {
+            m['name'].strip(): m['desc'].strip() for _, m in matches if m
+        }
+        
+        # Collect column details
+        column_details: List[str] = [
+            text for text, m in matches if not m and "Column:" in text and "Type:" in text
+        ]
+        
+        self._table_schemas = table_schemas
+        self._column_details = column_details
+        logger.info(f"   Preloaded {len(self._all_points)} points ({len(table_schemas)} tables, {len(column_details)} columns)")
+    
+    async def _embedded_collection_in_sync(self, collections) -> bool:
+        """Check the embedded collection exists and holds every schema text point"""
+        if not any(col.name == self.embedded_collection_name for col in collections.collections):
+            logger.info(f"   No '{self.embedded_collection_name}' collection, using hash vectors (run `make rag-index`)")
+            return False
+        
+        info = await asyncio.to_thread(self.vector_db.get_collection, self.embedded_collection_name)
+        expected = sum(1 for p in self._all_points if p.payload and p.payload.get('text'))
+        if info.points_count != expected:
+            logger.warning(
+                f"⚠️ ENHANCED RAG: '{self.embedded_collection_name}' is stale "
+                f"({info.points_count} of {expected} points), using hash vectors; re-run `make rag-index`"
+            )
+            return False
+        return True
+    
+    def _load_encoder(self):
+        """Load the sentence-transformer encoder, or return None if it is unavailable"""
+        try:
+            from sentence_transformers import SentenceTransformer
+            encoder = SentenceTransformer(EMBEDDING_MODEL)
+            logger.info(f"   Embedding model: {EMBEDDING_MODEL}")
+            return encoder
+        except Exception as e:
+            logger.warning(f"⚠️ ENHANCED RAG: Embedding model unavailable, using hash vectors: {e}")
+            return None
+    
+    def _write_embedded_collection(self, encoder) -> int:
+        """(Re)create the embedded collection from the preloaded schema points"""
+        points = [p for p in self._all_points if p.payload and p.payload.get('text')]
+        vectors = encoder.encode([p.payload['text'] for p in points], normalize_embeddings=True)
+        
+        if self.vector_db.collection_exists(self.embedded_collection_name):
+            self.vector_db.delete_collection(self.embedded_collection_name)
+        self.vector_db.create_collection(
+            collection_name=self.embedded_collection_name,
+            vectors_config=VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE)
+        )
+        self.vector_db.upsert(
+            collection_name=self.embedded_collection_name,
+            points=[
+                PointStruct(id=p.id, vector=vector.tolist(), payload=p.payload)
+                for p, vector in zip(points, vectors)
+            ],
+            wait=True
+        )
+        return len(points)
+    
+    async def build_embedding_index(self) -> int:
+        """
+        Copy the schema points into the embedded collection with encoder vectors.
+        
+        This is an explicit indexing step (``make rag-index``); initialize() only
+        reads the embedded collection and never writes to Qdrant. Re-run it after
+        the schema collection is rebuilt.
+        
+        Returns:
+            Number of points indexed
+        """
+        if not self._is_available:
+            raise RuntimeError("RAG system not available - initialize() it first")
+        
+        encoder = self._encoder or await asyncio.to_thread(self._load_encoder)
+        if encoder is None:
+            raise RuntimeError(f"Embedding model {EMBEDDING_MODEL} is not available")
+        
+        count = await asyncio.to_thread(self._write_embedded_collection, encoder)
+        self._encoder = encoder
+        self._search_collection = self.embedded_collection_name
+        self._embedding_cache.clear()
+        logger.info(f"✅ ENHANCED RAG: Indexed {count} points into '{self.embedded_collection_name}'")
+        return count
+    
     def is_available(self) -> bool:
         """Check if RAG system is available"""
         return self._is_available
     
-    async def _extract_schema_info(self):
+    def _extract_schema_info(self):
         """Extract schema information from the database for fallback"""
         try:
             conn = sqlite3.connect(self.db_path)
@@ -85,14 +264,15 @@ class EnhancedRAGSystem:
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
             tables = cursor.fetchall()
             
+            # Rebuilt from scratch so re-initializing never duplicates tables
+            schema_contexts: List[SchemaContext] = []
             for (table_name,) in tables:
                 if table_name.startswith('sqlite_'):
                     continue
                     
                 # Get column information
-                cursor.execute(f"PRAGMA table_info({table_name})")
-                columns_info = cursor.fetchall()
-                columns = [col[1] for col in columns_info]
+                cursor.execute(_TABLE_COLUMNS_SQL, (table_name,))
+                columns = [name for (name,) in cursor.fetchall()]
                 
                 # Get sample data (limit to 3 rows)
                 cursor.execute(f"SELECT * FROM {table_name} LIMIT 3")
@@ -113,9 +293,10 @@ class EnhancedRAGSystem:
                     description=description
                 )
                 
-                self.schema_contexts.append(schema_context)
+                schema_contexts.append(schema_context)
             
             conn.close()
+            self.schema_contexts = schema_contexts
             
         except Exception as e:
             logger.error(f"❌ ENHANCED RAG: Failed to extract schema info: {e}")
@@ -137,21 +318,29 @@ class EnhancedRAGSystem:
             return await self._fallback_context_retrieval(question)
         
         try:
-            # Create a simple vector from the question for search
-            question_vector = self._create_simple_vector(question)
+            question_vector = await self._embed_question(question)
+            
+            if self._encoder is not None:
+                # Real embeddings against the embedded collection: scores are
+                # meaningful, so keep only close matches
+                limit, score_threshold = 8, 0.3
+            else:
+                # Hash vectors: cast a wide net with a very low threshold
+                limit, score_threshold = 10, 0.01
             
-            # Search for relevant points with lower threshold
-            search_results = self.vector_db.search(
-                collection_name=self.collection_name,
+            # Blocking Qdrant client call, so keep it off the event loop
+            search_results = await asyncio.to_thread(
+                self.vector_db.search,
+                collection_name=self._search_collection,
                 query_vector=question_vector,
-                limit=10,  # Get more results
-                score_threshold=0.0,  # Lower threshold to get more matches
+                limit=limit,
+                score_threshold=score_threshold,
                 with_payload=True
             )
             
             relevant_contexts = []
             for result in search_results:
-                if result.payload and result.score > 0.01:  # Very low threshold
+                if result.payload:
                     # Extract relevant information from payload
                     context_text = result.payload.get('text', '')
                     table_name = result.payload.get('table', '')
@@ -161,16 +350,11 @@ class EnhancedRAGSystem:
                         relevant_contexts.append(f"{context_type}: {context_text}")
                         logger.info(f"📋 Retrieved context: {context_type} - {context_text[:50]}...")
             
-            # If no contexts found, get all schema data as fallback
+            # Nothing cleared the threshold; fall back to every preloaded table schema
+            # so the model still sees the full schema
             if not relevant_contexts:
                 logger.warning("⚠️ No specific contexts found, retrieving all schema data")
-                all_points = self.vector_db.scroll(
-                    collection_name=self.collection_name,
-                    limit=100,
-                    with_payload=True
-                )
-                
-                for point in all_points[0]:
+                for point in self._all_points:
                     if point.payload and point.payload.get('type') == 'table_schema':
                         context_text = point.payload.get('text', '')
                         if context_text:
@@ -183,41 +367,22 @@ class EnhancedRAGSystem:
             logger.error(f"❌ ENHANCED RAG: Vector search failed: {e}")
             return await self._fallback_context_retrieval(question)
     
+    async def _embed_question(self, text: str) -> List[float]:
+        """Embed text with the sentence-transformer, falling back to the hash vector"""
+        if self._encoder is None:
+            return self._create_simple_vector(text)
+        
+        # The cache is only touched on the event loop; model inference runs in a worker thread
+        embedding = self._embedding_cache.get(text)
+        if embedding is None:
+            vector = await asyncio.to_thread(self._encoder.encode, text, normalize_embeddings=True)
+            embedding = tuple(vector.tolist())
+            self._embedding_cache.set(text, embedding)
+        return list(embedding)
+    
     def _create_simple_vector(self, text: str) -> List[float]:
         """Create a simple vector representation of the text"""
-        import hashlib
-        import re
-        
-        # Create a 384-dimensional vector (matching Qdrant collection)
-        vector = [0.0] * 384
-        
-        # Normalize text
-        text_lower = text.lower()
-        
-        # Create better vector based on keywords and structure
-        keywords = {
-            'user': 0.1, 'users': 0.1, 'order': 0.2, 'orders': 0.2, 'count': 0.3,
-            'sales': 0.4, 'employee': 0.5, 'employees': 0.5, 'customer': 0.6,
-            'table': 0.7, 'column': 0.8, 'schema': 0.9
-        }
-        
-        # Fill vector based on keywords
-        for i, (keyword, value) in enumerate(keywords.items()):
-            if keyword in text_lower:
-                vector[i % 384] = value
-        
-        # Add text hash variation
-        text_hash = hashlib.md5(text.encode()).hexdigest()
-        for i in range(0, min(384, len(text_hash)), 2):
-            if i + 1 < 384:
-                vector[i] = int(text_hash[i:i+2], 16) / 255.0
-        
-        # Add character-based variation
-        for i, char in enumerate(text_lower):
-            if i < 384:
-                vector[i] = (vector[i] + ord(char) / 128.0) / 2
-        
-        return vector
+        return list(_simple_vector(text))
     
     async def _fallback_context_retrieval(self, question: str) -> List[str]:
         """Fallback to simple text matching when vector search fails"""
@@ -265,8 +430,15 @@ Please generate accurate SQL based on the database schema context above. Use the
             logger.error(f"❌ ENHANCED RAG: Failed to enhance question: {e}")
             return question
     
+    def invalidate_schema_cache(self) -> None:
+        """Drop the cached schema context so the next call re-reads the vector DB."""
+        self._schema_context_cache = None
+    
     def get_schema_context(self) -> str:
         """Get comprehensive database schema context for Vanna AI training."""
+        if self._schema_context_cache is not None:
+            return self._schema_context_cache
+        
         if not self._is_available:
             logger.error("❌ ENHANCED RAG: System not available - RAG is required for schema context")
             raise RuntimeError("RAG system not available - cannot provide schema context")
@@ -276,30 +448,9 @@ Please generate accurate SQL based on the database schema context above. Use the
             raise RuntimeError("Vector database not available - cannot provide schema context")
 
         try:
-            # Get schema from vector database
-            all_points = self.vector_db.scroll(
-                collection_name=self.collection_name,
-                limit=100,  # Get all points
-                with_payload=True
-            )
-
-            # Organize schema by table
-            table_schemas = {}
-            column_details = []
-            
-            for point in all_points[0]:  # all_points is a tuple (points, next_offset)
-                if point.payload and 'text' in point.payload:
-                    text = point.payload['text']
-                    
-                    # Parse table-level descriptions
-                    if text.startswith("Table: ") and "Description:" in text:
-                        table_name = text.split("Table: ")[1].split("\n")[0].strip()
-                        description = text.split("Description: ")[1].split("Columns:")[0].strip()
-                        table_schemas[table_name] = description
-                    
-                    # Collect column details
-                    elif "Column:" in text and "Type:" in text:
-                        column_details.append(text)
+            # Schema points were preloaded and indexed at initialize()
+            table_schemas = self._table_schemas
+            column_details = self._column_details
 
             if not table_schemas and not column_details:
                 logger.error("❌ ENHANCED RAG: No schema data found in vector database")
@@ -333,6 +484,7 @@ Please generate accurate SQL based on the database schema context above. Use the
 
             schema_context = "\n".join(schema_parts)
             logger.info(f"✅ ENHANCED RAG: Generated pure RAG-based schema context ({len(schema_context)} chars)")
+            self._schema_context_cache = schema_context
             return schema_context
 
         except Exception as e:
@@ -355,3 +507,14 @@ Please generate accurate SQL based on the database schema context above. Use the
         except Exception as e:
             logger.error(f"❌ ENHANCED RAG: Failed to get stats: {e}")
             return {}
+
+
+if __name__ == "__main__":
+    # Explicit indexing step: embed the schema collection with EMBEDDING_MODEL
+    async def _build_index() -> None:
+        rag = EnhancedRAGSystem()
+        if not await rag.initialize():
+            raise SystemExit("RAG system could not be initialized")
+        await rag.build_embedding_index()
+
+    asyncio.run(_build_index())
@@ -2,35 +2,53 @@
 Local Vanna AI client for connecting to the local Vanna server.
 """
 import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+
 import httpx
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from loguru import logger
-from pydantic import BaseModel
 
+from .cache import KeyedLocks, LRUCache
 from .config import settings
 from .enhanced_rag_system import EnhancedRAGSystem
+from .serialization import JSON_HEADERS, json_dumps, json_loads
+
+# Local Vanna server endpoints; full URLs are built once per client
+_ENDPOINTS = ("/health", "/generate_sql", "/train", "/training_data")
+_SUPPORTED_METHODS = frozenset({"GET", "POST"})
 
+# SQL cache key: the question plus the sorted retrieved contexts
+SqlCacheKey = Tuple[str, Tuple[str, ...]]
 
-class LocalVannaRequest(BaseModel):
-    """Request model for local Vanna server."""
-    question: str
-    user_id: Optional[str] = None
+# How long a successful /health check is trusted before asking again (seconds)
+_HEALTH_TTL = 30.0
 
+# Retry backoff bounds (seconds) for requests to the local Vanna server
+_RETRY_BASE_DELAY = 1.0
+_RETRY_MAX_DELAY = 30.0
 
-class LocalVannaResponse(BaseModel):
-    """Response model from local Vanna server."""
-    question: str
-    sql: str
-    success: bool
-    message: str
+# Failures that guarantee the server never processed the request body, and
+# statuses meaning it refused the request; only these are safe to retry
+# for non-idempotent calls
+_UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, httpx.WriteError)
+_REJECTED_STATUSES = frozenset({429, 503})
 
 
-class LocalTrainingRequest(BaseModel):
-    """Training request model for local Vanna server."""
-    question: str
-    sql: str
-    ddl: Optional[str] = None
-    documentation: Optional[str] = None
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP date) into seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
 
 
 class LocalVannaClientRepository:
@@ -39,9 +57,13 @@ class LocalVannaClientRepository:
     def __init__(self) -> None:
         """Initialize the local Vanna client."""
         self._initialized = False
+        self._init_lock = asyncio.Lock()
+        self._health_expires_at = 0.0
         self._server_url = getattr(settings, 'local_vanna_server_url', 'http://localhost:8001')
         self._timeout = getattr(settings, 'local_vanna_timeout', 30)
         self._max_retries = getattr(settings, 'local_vanna_max_retries', 3)
+        self._rag_max_chars = getattr(settings, 'rag_max_chars', 8000)
+        self._urls = {endpoint: f"{self._server_url}{endpoint}" for endpoint in _ENDPOINTS}
         
         # Initialize enhanced RAG system for intelligent context retrieval
         db_url = str(settings.database_url)
@@ -52,12 +74,23 @@ class LocalVannaClientRepository:
         self._rag_initialized = False
         logger.info("✅ Enhanced RAG system created (will initialize on first use)")
         
-        # Initialize HTTP client with longer timeout for training
+        # Initialize HTTP client with longer timeout for training; keep idle
+        # connections for 60s (httpx default is 5s) so intermittent calls reuse them
         self._http_client = httpx.AsyncClient(
             timeout=60.0,  # 60 seconds for training operations
-            limits=httpx.Limits(max_keepalive_connections=10, max_connections=20)
+            limits=httpx.Limits(
+                max_keepalive_connections=100,
+                max_connections=1000,
+                keepalive_expiry=60.0
+            )
         )
         
+        # Generated SQL keyed by the question and its RAG context;
+        # cleared whenever the model is trained. Per-key locks coalesce concurrent misses.
+        self._sql_cache: LRUCache[SqlCacheKey, str] = LRUCache(maxsize=1024)
+        self._sql_locks: KeyedLocks[SqlCacheKey] = KeyedLocks()
+        self._train_generation = 0
+        
         logger.info(f"🔗 Local Vanna client initialized for server: {self._server_url}")
     
     async def _initialize_rag_system(self) -> None:
@@ -71,85 +104,153 @@ class LocalVannaClientRepository:
                 logger.error(f"❌ Failed to initialize RAG system: {e}")
                 raise
     
+    async def _ensure_rag_system(self) -> bool:
+        """Initialize the RAG system once, serialized with initialize()."""
+        if not self._rag_initialized:
+            async with self._init_lock:
+                await self._initialize_rag_system()
+        return self._rag_initialized
+    
     async def _make_request(
         self, 
         endpoint: str, 
         method: str = "GET", 
         data: Optional[Dict[str, Any]] = None,
         retries: int = None,
-        timeout: Optional[float] = None
+        timeout: Optional[float] = None,
+        idempotent: Optional[bool] = None
     ) -> Dict[str, Any]:
-        """Make HTTP request to local Vanna server with retry logic."""
+        """
+        Make HTTP request to local Vanna server with retry logic.
+        
+        Non-idempotent requests (POSTs, unless flagged otherwise) are only retried
+        when the server cannot have processed them, so a retry never repeats work
+        such as inserting training data twice.
+        """
+        method = method.upper()
+        if method not in _SUPPORTED_METHODS:
+            raise ValueError(f"Unsupported HTTP method: {method}")
         if retries is None:
             retries = self._max_retries
-            
-        url = f"{self._server_url}{endpoint}"
+        if idempotent is None:
+            idempotent = method == "GET"
+        
+        url = self._urls.get(endpoint) or f"{self._server_url}{endpoint}"
+        if method == "POST":
+            content, headers = json_dumps(data), JSON_HEADERS
+        else:
+            content, headers = None, None
         
         # Use custom timeout if provided, otherwise use client default
-        client_timeout = timeout if timeout else None
+        # (passing None to httpx would disable the timeout entirely)
+        client_timeout = timeout if timeout else httpx.USE_CLIENT_DEFAULT
         
+        delay = _RETRY_BASE_DELAY
         for attempt in range(retries + 1):
+            retry_after = None
             try:
-                if method.upper() == "GET":
-                    response = await self._http_client.get(url, timeout=client_timeout)
-                elif method.upper() == "POST":
-                    response = await self._http_client.post(url, json=data, timeout=client_timeout)
-                else:
-                    raise ValueError(f"Unsupported HTTP method: {method}")
+                response = await self._http_client.request(
+                    method, url, content=content, headers=headers, timeout=client_timeout
+                )
                 
-                response.raise_for_status()
-                return response.json()
-                
-            except httpx.TimeoutException:
+            except httpx.TimeoutException as e:
+                self._health_expires_at = 0.0
                 logger.warning(f"⏱️ Timeout on attempt {attempt + 1}/{retries + 1} for {url}")
-                if attempt == retries:
-                    raise Exception(f"Request timeout after {retries + 1} attempts")
-                    
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code >= 500:  # Server error - retry
-                    logger.warning(f"🔄 Server error {e.response.status_code} on attempt {attempt + 1}/{retries + 1}")
-                    if attempt == retries:
-                        raise Exception(f"Server error after {retries + 1} attempts: {e.response.status_code}")
-                else:  # Client error - don't retry
-                    raise Exception(f"Client error: {e.response.status_code} - {e.response.text}")
-                    
-            except Exception as e:
+                if attempt == retries or not (idempotent or isinstance(e, _UNSENT_ERRORS)):
+                    raise Exception(f"Request timeout after {attempt + 1} attempts")
+            
+            except httpx.TransportError as e:  # Connection refused/reset, protocol errors - retry
+                self._health_expires_at = 0.0
                 logger.warning(f"🔄 Request failed on attempt {attempt + 1}/{retries + 1}: {e}")
-                if attempt == retries:
-                    raise Exception(f"Request failed after {retries + 1} attempts: {e}")
+                if attempt == retries or not (idempotent or isinstance(e, _UNSENT_ERRORS)):
+                    raise Exception(f"Request failed after {attempt + 1} attempts: {e}")
+            
+            except Exception as e:  # Invalid request - don't retry
+                raise Exception(f"Request failed: {e}") from e
             
-            # Wait before retry
+            else:
+                status_code = response.status_code
+                if response.is_success:
+                    try:
+                        return json_loads(response.content)
+                    except Exception as e:  # Bad response body - don't retry
+                        raise Exception(f"Request failed: {e}") from e
+                
+                if status_code >= 500 or status_code == 429:  # Server error / throttled - retry
+                    self._health_expires_at = 0.0
+                    logger.warning(f"🔄 Server error {status_code} on attempt {attempt + 1}/{retries + 1}")
+                    if attempt == retries or not (idempotent or status_code in _REJECTED_STATUSES):
+                        raise Exception(f"Server error after {attempt + 1} attempts: {status_code}")
+                    retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                else:  # Client error - don't retry
+                    raise Exception(f"Client error: {status_code} - {response.text}")
+            
+            # Wait before retry: decorrelated jitter, never sooner than Retry-After
             if attempt < retries:
-                await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                delay = min(_RETRY_MAX_DELAY, random.uniform(_RETRY_BASE_DELAY, delay * 3))
+                if retry_after is not None:
+                    delay = max(delay, min(retry_after, _RETRY_MAX_DELAY))
+                await asyncio.sleep(delay)
         
         raise Exception("Unexpected error in request retry logic")
     
     async def _check_server_health(self) -> bool:
-        """Check if the local Vanna server is healthy."""
+        """
+        Check if the local Vanna server is healthy.
+        
+        A healthy verdict is cached for _HEALTH_TTL seconds; any timeout, server
+        error or connection failure on a later request clears it.
+        """
+        now = time.monotonic()
+        if now < self._health_expires_at:
+            return True
+        
         try:
-            response = await self._make_request("/health")
-            return response.get("status") == "healthy" and response.get("vanna_initialized", False)
+            # A single attempt: callers (startup, first requests) must not sit through backoff
+            response = await self._make_request("/health", retries=0)
+            healthy = response.get("status") == "healthy" and response.get("vanna_initialized", False)
+            if healthy:
+                self._health_expires_at = now + _HEALTH_TTL
+            return healthy
         except Exception as e:
             logger.error(f"❌ Local Vanna server health check failed: {e}")
             return False
     
     async def initialize(self) -> bool:
-        """Initialize the local Vanna client."""
-        try:
-            # Check server health
-            if not await self._check_server_health():
-                raise Exception("Local Vanna server is not healthy")
-            
-            # Initialize RAG system
-            await self._initialize_rag_system()
-            
-            self._initialized = True
-            logger.info("✅ Local Vanna client initialized successfully")
+        """
+        Initialize the local Vanna client.
+        
+        Concurrent callers during a cold start share one initialization instead
+        of each running their own health check and RAG setup.
+        """
+        if self._initialized:
             return True
+        
+        async with self._init_lock:
+            # Another coroutine may have finished initializing while we waited
+            if self._initialized:
+                return True
             
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize local Vanna client: {e}")
-            return False
+            try:
+                # Check server health and initialize the RAG system concurrently;
+                # the HTTP round-trip and the Qdrant/model setup are independent
+                healthy, rag_result = await asyncio.gather(
+                    self._check_server_health(),
+                    self._initialize_rag_system(),
+                    return_exceptions=True
+                )
+                if healthy is not True:
+                    raise Exception("Local Vanna server is not healthy")
+                if isinstance(rag_result, BaseException):
+                    raise rag_result
+                
+                self._initialized = True
+                logger.info("✅ Local Vanna client initialized successfully")
+                return True
+                
+            except Exception as e:
+                logger.error(f"❌ Failed to initialize local Vanna client: {e}")
+                return False
     
     async def generate_sql(self, question: str, user_id: Optional[str] = None) -> str:
         """Generate SQL from natural language question."""
@@ -159,11 +260,13 @@ class LocalVannaClientRepository:
         
         try:
             # Get RAG context for the question
+            rag_context_list: List[str] = []
             rag_context = ""
             if self._rag_initialized:
                 try:
-                    rag_context_list = await self._rag_system.retrieve_relevant_context(question)
-                    rag_context = "\n".join(rag_context_list) if rag_context_list else ""
+                    rag_context_list = await self._rag_system.retrieve_relevant_context(question) or []
+                    # Capped to bound prompt size
+                    rag_context = "\n".join(rag_context_list)[:self._rag_max_chars]
                     logger.info(f"🔍 Retrieved RAG context: {len(rag_context)} characters")
                 except Exception as e:
                     logger.warning(f"⚠️ RAG context retrieval failed: {e}")
@@ -173,26 +276,64 @@ class LocalVannaClientRepository:
             if rag_context:
                 enhanced_question = f"{question}\n\nContext: {rag_context}"
             
-            # Send request to local Vanna server
-            request_data = LocalVannaRequest(question=enhanced_question, user_id=user_id)
-            response_data = await self._make_request(
-                "/generate_sql", 
-                method="POST", 
-                data=request_data.dict()
-            )
-            
-            response = LocalVannaResponse(**response_data)
+            cache_key = self._sql_cache_key(question, rag_context_list)
+            cached_sql = self._sql_cache.get(cache_key)
+            if cached_sql is not None:
+                logger.info("⚡ Local SQL cache hit")
+                return cached_sql
             
-            if not response.success:
-                raise Exception(f"SQL generation failed: {response.message}")
+            async with self._sql_locks.hold(cache_key):
+                # Another coroutine may have filled the cache while we waited
+                cached_sql = self._sql_cache.peek(cache_key)
+                if cached_sql is not None:
+                    return cached_sql
+                
+                generation = self._train_generation
+                sql = await self._request_sql(enhanced_question, user_id)
+                # Don't cache an answer that training made stale while it was in flight
+                if generation == self._train_generation:
+                    self._sql_cache.set(cache_key, sql)
             
             logger.info(f"✅ Generated SQL for question: {question[:100]}...")
-            return response.sql
+            return sql
             
         except Exception as e:
             logger.error(f"❌ Failed to generate SQL: {e}")
             raise
     
+    async def _request_sql(self, enhanced_question: str, user_id: Optional[str]) -> str:
+        """Ask the local Vanna server to generate SQL for an enhanced question."""
+        response_data = await self._make_request(
+            "/generate_sql", 
+            method="POST", 
+            data={"question": enhanced_question, "user_id": user_id},
+            idempotent=True  # SQL generation has no side effects
+        )
+        
+        if not response_data.get("success"):
+            raise Exception(f"SQL generation failed: {response_data.get('message')}")
+        
+        return response_data["sql"]
+    
+    @staticmethod
+    def _sql_cache_key(question: str, contexts: List[str]) -> SqlCacheKey:
+        """Key for the question and the *set* of retrieved contexts.
+        
+        Contexts are sorted so the same chunks retrieved in a different order
+        share a cache entry. The tuple is hashed natively (string hashes are
+        computed in C and cached on the objects), with no encoding or digest.
+        """
+        return question, tuple(sorted(contexts))
+    
+    def _invalidate_sql_cache(self) -> None:
+        """Forget generated SQL after the model has been trained."""
+        self._train_generation += 1
+        self._sql_cache.clear()
+    
+    def sql_cache_stats(self) -> Dict[str, int]:
+        """Return SQL generation cache statistics."""
+        return self._sql_cache.stats()
+    
     async def train_with_sql(self, question: str, sql: str, user_id: Optional[str] = None) -> bool:
         """Train the local Vanna model with a question-SQL pair."""
         if not self._initialized:
@@ -200,16 +341,16 @@ class LocalVannaClientRepository:
                 raise Exception("Local Vanna client not initialized")
         
         try:
-            request_data = LocalTrainingRequest(question=question, sql=sql)
             response = await self._make_request(
                 "/train", 
                 method="POST", 
-                data=request_data.dict(),
+                data={"question": question, "sql": sql, "ddl": None, "documentation": None},
                 timeout=60.0  # 60 seconds for training
             )
             
             success = response.get("success", False)
             if success:
+                self._invalidate_sql_cache()
                 logger.info(f"✅ Trained Vanna with question: {question[:100]}...")
             else:
                 logger.warning(f"⚠️ Training response: {response.get('message', 'Unknown error')}")
@@ -227,16 +368,16 @@ class LocalVannaClientRepository:
                 raise Exception("Local Vanna client not initialized")
         
         try:
-            request_data = LocalTrainingRequest(question="", sql="", ddl=ddl)
             response = await self._make_request(
                 "/train", 
                 method="POST", 
-                data=request_data.dict(),
+                data={"question": "", "sql": "", "ddl": ddl, "documentation": None},
                 timeout=60.0  # 60 seconds for training
             )
             
             success = response.get("success", False)
             if success:
+                self._invalidate_sql_cache()
                 logger.info(f"✅ Trained Vanna with DDL: {ddl[:100]}...")
             else:
                 logger.warning(f"⚠️ Training response: {response.get('message', 'Unknown error')}")
@@ -247,6 +388,33 @@ class LocalVannaClientRepository:
             logger.error(f"❌ Failed to train Vanna with DDL: {e}")
             return False
     
+    async def train_many(self, examples: List[Dict[str, str]], max_concurrency: int = 8) -> List[bool]:
+        """
+        Train the local Vanna model with many examples concurrently.
+        
+        Each example is either ``{"question": ..., "sql": ...}`` or ``{"ddl": ...}``.
+        Up to ``max_concurrency`` training requests are in flight at once, so bulk
+        loads overlap their round-trips instead of paying for them one by one.
+        
+        Args:
+            examples: Question/SQL pairs and/or DDL statements
+            max_concurrency: Maximum number of simultaneous /train requests
+            
+        Returns:
+            Per-example success flags, in input order
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def train_one(example: Dict[str, str]) -> bool:
+            async with semaphore:
+                if example.get("ddl"):
+                    return await self.train_with_ddl(example["ddl"])
+                return await self.train_with_sql(example["question"], example["sql"])
+        
+        results = await asyncio.gather(*(train_one(example) for example in examples))
+        logger.info(f"✅ Bulk training finished: {sum(results)}/{len(results)} succeeded")
+        return list(results)
+    
     async def get_training_data(self) -> List[Dict[str, Any]]:
         """Get all training data from the local Vanna server."""
         if not self._initialized:
@@ -269,6 +437,14 @@ class LocalVannaClientRepository:
 
 
 # Factory function for dependency injection
+@lru_cache(maxsize=1)
 def create_local_vanna_client() -> LocalVannaClientRepository:
-    """Create and return a local Vanna client instance."""
+    """Return the process-wide local Vanna client, creating it on first use."""
     return LocalVannaClientRepository()
+
+
+async def close_local_vanna_client() -> None:
+    """Close the shared local Vanna client, if one was created."""
+    if create_local_vanna_client.cache_info().currsize:
+        await create_local_vanna_client().close()
+        create_local_vanna_client.cache_clear()
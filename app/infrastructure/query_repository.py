@@ -1,8 +1,9 @@
 """
 Query repository implementation for storing and retrieving queries.
 """
-import uuid
-from typing import Optional
+import itertools
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
 
 from loguru import logger
 
@@ -13,10 +14,27 @@ from ..domain.repositories import QueryRepository
 class InMemoryQueryRepository(QueryRepository):
     """In-memory implementation of the query repository for development."""
     
-    def __init__(self) -> None:
-        """Initialize the in-memory repository."""
-        self._queries: dict[str, QueryRequest] = {}
-        self._responses: dict[str, QueryResponse] = {}
+    def __init__(self, max_entries: int = 10_000) -> None:
+        """
+        Initialize the in-memory repository.
+        
+        Args:
+            max_entries: Maximum number of queries kept; the least recently
+                used query (and its response) is evicted beyond this
+        """
+        # Keyed by monotonic integer IDs; IDs are strings only at the interface
+        self._next_id = itertools.count(1)
+        self._max_entries = max_entries
+        self._queries: "OrderedDict[int, QueryRequest]" = OrderedDict()
+        self._responses: dict[int, QueryResponse] = {}
+    
+    @staticmethod
+    def _key(query_id: str) -> Optional[int]:
+        """Convert an external query ID to the internal integer key."""
+        try:
+            return int(query_id)
+        except (TypeError, ValueError):
+            return None
     
     async def save_query(self, query: QueryRequest) -> str:
         """
@@ -28,10 +46,13 @@ class InMemoryQueryRepository(QueryRepository):
         Returns:
             Generated query ID
         """
-        query_id = str(uuid.uuid4())
-        self._queries[query_id] = query
-        logger.info(f"Saved query with ID: {query_id}")
-        return query_id
+        key = next(self._next_id)
+        self._queries[key] = query
+        if len(self._queries) > self._max_entries:
+            evicted_key, _ = self._queries.popitem(last=False)
+            self._responses.pop(evicted_key, None)
+        logger.info(f"Saved query with ID: {key}")
+        return str(key)
     
     async def get_query_by_id(self, query_id: str) -> Optional[QueryRequest]:
         """
@@ -43,7 +64,11 @@ class InMemoryQueryRepository(QueryRepository):
         Returns:
             Query request if found, None otherwise
         """
-        return self._queries.get(query_id)
+        key = self._key(query_id)
+        query = self._queries.get(key)
+        if query is not None:
+            self._queries.move_to_end(key)
+        return query
     
     async def save_response(self, query_id: str, response: QueryResponse) -> None:
         """
@@ -53,7 +78,14 @@ class InMemoryQueryRepository(QueryRepository):
             query_id: ID of the query this response belongs to
             response: Query response to save
         """
-        self._responses[query_id] = response
+        key = self._key(query_id)
+        if key is None:
+            raise ValueError(f"Invalid query ID: {query_id!r}")
+        if key not in self._queries:
+            # The query was already evicted; don't keep an orphaned response
+            logger.warning(f"Dropping response for evicted query ID: {query_id}")
+            return
+        self._responses[key] = response
         logger.info(f"Saved response for query ID: {query_id}")
     
     async def get_response_by_id(self, query_id: str) -> Optional[QueryResponse]:
@@ -66,22 +98,31 @@ class InMemoryQueryRepository(QueryRepository):
         Returns:
             Query response if found, None otherwise
         """
-        return self._responses.get(query_id)
+        return self._responses.get(self._key(query_id))
     
-    async def get_all_queries(self) -> list[tuple[str, QueryRequest]]:
+    async def get_all_queries(self) -> AsyncIterator[tuple[str, QueryRequest]]:
         """
-        Get all stored queries with their IDs.
+        Iterate over all stored queries with their IDs.
         
-        Returns:
-            List of (query_id, query_request) tuples
+        Iterates over a snapshot, so saves and lookups made while the caller
+        is consuming it (which reorder or evict entries) are safe.
+        
+        Yields:
+            (query_id, query_request) tuples, least recently used first
         """
-        return list(self._queries.items())
+        for key, query in tuple(self._queries.items()):
+            yield str(key), query
     
-    async def get_all_responses(self) -> list[tuple[str, QueryResponse]]:
+    async def get_all_responses(self) -> AsyncIterator[tuple[str, QueryResponse]]:
         """
-        Get all stored responses with their query IDs.
+        Iterate over all stored responses with their query IDs.
         
-        Returns:
-            List of (query_id, query_response) tuples
+        Yields:
+            (query_id, query_response) tuples
         """
-        return list(self._responses.items())
+        for key, response in tuple(self._responses.items()):
+            yield str(key), response
+
+
+# Global repository instance, shared so IDs stay unique and the LRU cap applies
+query_repository = InMemoryQueryRepository()
@@ -0,0 +1,31 @@
+"""
+JSON encoding helpers for outbound HTTP calls, using orjson when it is installed.
+"""
+import json
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Headers to send alongside a json_dumps() body
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def json_dumps(obj: Any, default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """Serialize obj to compact UTF-8 JSON bytes.
+
+    ``default`` converts objects the encoder does not support natively, as in
+    ``json.dumps``.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=default)
+    return json.dumps(obj, separators=(",", ":"), default=default).encode("utf-8")
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """Deserialize JSON bytes or text."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
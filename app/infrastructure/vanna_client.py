@@ -2,14 +2,153 @@
 Vanna AI client infrastructure and repository implementation.
 """
 import asyncio
-from typing import Optional
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
 
+import requests
 import vanna
 from loguru import logger
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from ..domain.repositories import VannaRepository
+from .cache import KeyedLocks, LRUCache
 from .config import settings
 from .enhanced_rag_system import EnhancedRAGSystem
+from .serialization import JSON_HEADERS, json_dumps, json_loads
+
+# Process-wide cache of generated SQL keyed by whitespace-normalized question,
+# shared by all client instances, plus per-question locks so concurrent misses
+# coalesce. Entries expire after an hour so retraining on the Vanna side is
+# eventually picked up.
+_SQL_CACHE_TTL = 3600.0
+_sql_cache: LRUCache[str, str] = LRUCache(maxsize=1024, ttl=_SQL_CACHE_TTL)
+_sql_locks: KeyedLocks[str] = KeyedLocks()
+
+# How long a check_connection() verdict is reused before probing Vanna again (seconds)
+_CONNECTION_TTL = 30.0
+
+# Vanna RPC methods that only read or generate, so repeating one after a
+# gateway error is harmless; training writes (add_*, remove_*) are not listed
+_IDEMPOTENT_RPC_METHODS = frozenset({
+    "submit_prompt",
+    "get_training_data",
+    "get_related_training_data",
+    "list_my_models",
+})
+
+# (connect, read) timeout for Vanna RPC calls, in seconds
+_RPC_TIMEOUT = (3.05, 30)
+
+# Example Q&A pairs for better SQL generation
+_TRAINING_EXAMPLES: Tuple[Tuple[str, str], ...] = (
+    ("Show me all employees", "SELECT * FROM employees"),
+    ("What is the total sales amount?", "SELECT SUM(amount) FROM sales"),
+    ("Show me employees in Engineering", "SELECT * FROM employees WHERE department = 'Engineering'"),
+    ("What is the average salary by department?", "SELECT department, AVG(salary) FROM employees GROUP BY department"),
+    ("Show me all users", "SELECT * FROM users"),
+    ("List all orders", "SELECT * FROM orders"),
+    ("Find pending orders", "SELECT * FROM orders WHERE status = 'pending'"),
+    ("Show me high salary employees", "SELECT * FROM employees WHERE salary > 70000"),
+    ("Count employees by department", "SELECT department, COUNT(*) FROM employees GROUP BY department"),
+    ("Show me all tables", "SELECT name FROM sqlite_master WHERE type='table'"),
+)
+
+# Pattern-matching fallback: the first rule whose needles all occur in the
+# lowercased question wins
+_FALLBACK_RULES: Tuple[Tuple[Tuple[str, ...], str], ...] = (
+    (("all employees",), "SELECT * FROM employees"),
+    (("employees in engineering",), "SELECT * FROM employees WHERE department = 'Engineering'"),
+    (("average salary",), "SELECT department, AVG(salary) as average_salary FROM employees GROUP BY department"),
+    (("names start with", "j"), "SELECT * FROM employees WHERE first_name LIKE 'J%'"),
+    (("all tables",), "SELECT name FROM sqlite_master WHERE type='table'"),
+)
+_DEFAULT_FALLBACK_SQL = "SELECT * FROM employees"
+
+# Sidecar mapping account + model -> hash of the last schema + examples trained
+# into it and when. Delete the file to force a retrain.
+_TRAIN_CACHE_PATH = Path.home() / ".vanna_cache" / "schema_train.json"
+
+# Retrain at least this often (seconds), in case the remote model was reset
+_TRAIN_CACHE_TTL = 7 * 24 * 3600.0
+
+
+def _train_cache_key() -> str:
+    """Identify the remote model being trained: org, model and (hashed) API key."""
+    api_key = (settings.vanna_api_key or "").encode("utf-8")
+    key_id = hashlib.blake2b(api_key, digest_size=8).hexdigest()
+    return f"{settings.vanna_org_id}:{settings.vanna_model}:{key_id}"
+
+
+def _train_cache_hit(cache: Dict[str, Any], key: str, training_hash: str) -> bool:
+    """True if key was trained with training_hash within _TRAIN_CACHE_TTL."""
+    entry = cache.get(key)
+    if not isinstance(entry, dict) or entry.get("hash") != training_hash:
+        return False
+    trained_at = entry.get("trained_at")
+    return isinstance(trained_at, (int, float)) and time.time() - trained_at < _TRAIN_CACHE_TTL
+
+
+def _training_hash(schema_context: str) -> str:
+    """Hash the schema and training examples that would be uploaded to Vanna."""
+    digest = hashlib.blake2b(schema_context.encode("utf-8"), digest_size=16)
+    digest.update(repr(_TRAINING_EXAMPLES).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _load_train_cache() -> Dict[str, Any]:
+    """Read the training sidecar, treating a missing or corrupt file as empty."""
+    try:
+        cache = json.loads(_TRAIN_CACHE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def _save_train_cache(cache: Dict[str, Any]) -> None:
+    """Persist the training sidecar; failures only cost a retrain next time."""
+    try:
+        _TRAIN_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        _TRAIN_CACHE_PATH.write_text(json.dumps(cache), encoding="utf-8")
+    except OSError as e:
+        logger.warning(f"⚠️ Could not write training cache {_TRAIN_CACHE_PATH}: {e}")
+
+
+def _rpc_param_to_dict(obj):
+    """JSON fallback for Vanna RPC params, which are plain objects/dataclasses."""
+    try:
+        return vars(obj)
+    except TypeError:
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable") from None
+
+
+def _create_http_session(retry_gateway_errors: bool) -> requests.Session:
+    """
+    Create a keep-alive session with a small pool.
+    
+    Connection failures are always retried. With retry_gateway_errors, POSTs
+    answered with 502/503/504 are retried too, which is only safe for RPCs
+    that do not change server state.
+    """
+    if retry_gateway_errors:
+        retry = Retry(
+            total=2,
+            backoff_factor=0.2,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"POST"},
+            raise_on_status=False,  # Hand the last error response back to the caller
+        )
+    else:
+        retry = Retry(total=2, backoff_factor=0.2)
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+    session.mount("https://", adapter)
+    return session
 
 
 class VannaClientRepository(VannaRepository):
@@ -19,6 +158,16 @@ class VannaClientRepository(VannaRepository):
         """Initialize the Vanna client."""
         self._initialized = False
         self._api_key_set = False
+        # Pooled HTTP sessions so every Vanna RPC reuses a TLS connection; read-only
+        # RPCs also retry gateway errors, writes such as training only connection errors
+        self._http = _create_http_session(retry_gateway_errors=True)
+        self._http_writes = _create_http_session(retry_gateway_errors=False)
+        # Worker threads for blocking Vanna SDK calls
+        self._executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="vanna")
+        # Last check_connection() verdict and when it stops being trusted
+        self._conn_status = False
+        self._conn_status_expires_at = 0.0
+        self._conn_probe_lock = asyncio.Lock()
         
         # Initialize enhanced RAG system for intelligent context retrieval
         db_url = str(settings.database_url)
@@ -27,6 +176,7 @@ class VannaClientRepository(VannaRepository):
             db_path = "vanna_app_clean.db"  # Use the populated database
         self._rag_system = EnhancedRAGSystem(db_path=db_path)
         self._rag_initialized = False
+        self._rag_init_lock = asyncio.Lock()
         logger.info("✅ Enhanced RAG system created (will initialize on first use)")
         
         # Initialize REAL Vanna AI with Qdrant RAG
@@ -75,48 +225,35 @@ class VannaClientRepository(VannaRepository):
                 original_rpc_call = self._vanna_client._rpc_call
                 logger.info("✅ Found _rpc_call method directly on client, proceeding with patching...")
                 
+                # Settings are fixed for the process, so build the auth headers once
+                self._rpc_headers = {
+                    **JSON_HEADERS,
+                    "Vanna-Key": settings.vanna_api_key,
+                    "Vanna-Org": settings.vanna_org_id,  # Use org_id from settings
+                    "Vanna-Email": settings.vanna_email,
+                }
+                
                 def patched_rpc_call(method, params):
-                    import requests
-                    import json
-                    
-                    # Create headers with email and org
-                    headers = {
-                        "Content-Type": "application/json",
-                        "Vanna-Key": settings.vanna_api_key,
-                        "Vanna-Org": settings.vanna_org_id,  # Use org_id from settings
-                        "Vanna-Email": settings.vanna_email,
-                    }
-                    
-                    # Convert params to dict format
-                    if params:
-                        converted_params = []
-                        for param in params:
-                            if hasattr(param, '__dict__'):
-                                converted_params.append(param.__dict__)
-                            else:
-                                converted_params.append(param)
-                    else:
-                        converted_params = []
-                    
+                    # Param objects are turned into dicts by the encoder's default hook
                     data = {
                         "method": method,
-                        "params": converted_params,
+                        "params": params or [],
                         "jsonrpc": "2.0",
                         "id": 1
                     }
                     
-                    logger.info(f"🚀 RPC Call: {method} with email: {settings.vanna_email}, org: {settings.vanna_org_id}")
-                    logger.info(f"📋 Headers: {headers}")
-                    logger.info(f"📋 Data: {data}")
+                    logger.debug("🚀 RPC Call: {}", method)
                     
-                    response = requests.post(
-                        self._vanna_client._endpoint, 
-                        headers=headers, 
-                        data=json.dumps(data)
+                    http = self._http if method in _IDEMPOTENT_RPC_METHODS else self._http_writes
+                    response = http.post(
+                        self._vanna_client._endpoint,
+                        headers=self._rpc_headers,
+                        data=json_dumps(data, default=_rpc_param_to_dict),
+                        timeout=_RPC_TIMEOUT,
                     )
                     
-                    result = response.json()
-                    logger.info(f"📤 RPC Response: {result}")
+                    result = json_loads(response.content)
+                    logger.debug("📤 RPC Response: {}", result)
                     return result
                 
                 # Replace the method
@@ -126,7 +263,7 @@ class VannaClientRepository(VannaRepository):
         except Exception as e:
             logger.warning(f"⚠️ Failed to patch RPC calls: {e}")
 
-    def _train_vanna_model(self):
+    async def _train_vanna_model(self):
         """Train the Vanna AI model with database schema from RAG system."""
         if not self._vanna_client:
             logger.error("❌ Vanna AI client not available for training")
@@ -148,32 +285,46 @@ class VannaClientRepository(VannaRepository):
                 logger.error("RAG system not available")
                 raise RuntimeError("RAG system is required for schema context - cannot proceed without it")
 
+            # Skip the upload when this model already has the same schema and examples
+            training_hash = _training_hash(schema_context)
+            train_cache = _load_train_cache()
+            train_cache_key = _train_cache_key()
+            if _train_cache_hit(train_cache, train_cache_key, training_hash):
+                logger.info("⚡ Schema unchanged, skipping DDL upload")
+                return True
+
             # Train Vanna AI with the schema
             logger.info("Training Vanna AI with schema...")
             try:
-                result = self._vanna_client.train(ddl=schema_context)
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    self._executor, partial(self._vanna_client.train, ddl=schema_context)
+                )
                 logger.info("Vanna AI schema training completed")
 
-                # Add example Q&A pairs for better SQL generation
-                examples = [
-                    ("Show me all employees", "SELECT * FROM employees"),
-                    ("What is the total sales amount?", "SELECT SUM(amount) FROM sales"),
-                    ("Show me employees in Engineering", "SELECT * FROM employees WHERE department = 'Engineering'"),
-                    ("What is the average salary by department?", "SELECT department, AVG(salary) FROM employees GROUP BY department"),
-                    ("Show me all users", "SELECT * FROM users"),
-                    ("List all orders", "SELECT * FROM orders"),
-                    ("Find pending orders", "SELECT * FROM orders WHERE status = 'pending'"),
-                    ("Show me high salary employees", "SELECT * FROM employees WHERE salary > 70000"),
-                    ("Count employees by department", "SELECT department, COUNT(*) FROM employees GROUP BY department"),
-                    ("Show me all tables", "SELECT name FROM sqlite_master WHERE type='table'")
-                ]
-
+                examples = _TRAINING_EXAMPLES
                 logger.info(f"📝 Adding {len(examples)} training examples...")
-                for question, sql in examples:
-                    try:
-                        self._vanna_client.train(question=question, sql=sql)
-                    except Exception as e:
-                        logger.warning(f"Failed to add example '{question}': {e}")
+                # Send the examples concurrently over the pooled session
+                outcomes = await asyncio.gather(
+                    *(
+                        loop.run_in_executor(
+                            self._executor,
+                            partial(self._vanna_client.train, question=question, sql=sql),
+                        )
+                        for question, sql in examples
+                    ),
+                    return_exceptions=True,
+                )
+                failed = False
+                for (question, _), outcome in zip(examples, outcomes):
+                    if isinstance(outcome, Exception):
+                        failed = True
+                        logger.warning(f"Failed to add example '{question}': {outcome}")
+
+                # Only remember a complete upload so partial failures are retried
+                if not failed:
+                    train_cache[train_cache_key] = {"hash": training_hash, "trained_at": time.time()}
+                    _save_train_cache(train_cache)
 
                 logger.info("Vanna AI training completed successfully")
                 logger.info(f"Training result: {result}")
@@ -213,54 +364,98 @@ class VannaClientRepository(VannaRepository):
             logger.warning(f"Vanna AI connection test failed: {e}")
             return False
     
+    async def _ensure_rag_initialized(self) -> None:
+        """
+        Initialize the RAG system and train Vanna on its schema exactly once.
+        
+        Concurrent first callers wait on the same lock, so the schema upload
+        happens a single time.
+        
+        Raises:
+            RuntimeError: If the RAG system could not be initialized
+        """
+        if self._rag_initialized:
+            return
+        
+        async with self._rag_init_lock:
+            if self._rag_initialized:
+                return
+            
+            if not await self._load_rag_system():
+                raise RuntimeError("Cannot proceed without RAG system - schema context is required")
+            
+            logger.info("📚 Training Vanna AI with database schema from RAG...")
+            if await self._train_vanna_model():
+                logger.info("✅ Vanna AI training completed successfully")
+            else:
+                logger.warning("⚠️ Vanna AI training failed, but proceeding with generation")
+            self._rag_initialized = True
+    
+    async def _ensure_rag_system(self) -> bool:
+        """
+        Initialize only the RAG system, without training Vanna.
+        
+        Used by status checks, which must not upload training data. Shares the
+        init lock with _ensure_rag_initialized(), which reuses the loaded system.
+        """
+        if self._rag_system.is_available():
+            return True
+        async with self._rag_init_lock:
+            return await self._load_rag_system()
+    
+    async def _load_rag_system(self) -> bool:
+        """Initialize the RAG system unless it is already available; caller holds the init lock."""
+        if self._rag_system.is_available():
+            return True
+        logger.info("🔧 Initializing RAG system for context retrieval...")
+        if not await self._rag_system.initialize():
+            logger.error("❌ RAG system initialization failed")
+            return False
+        logger.info("✅ RAG system initialized successfully")
+        return True
+    
+    async def _ask(self, question: str):
+        """Run the blocking Vanna ask() call on the worker pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._vanna_client.ask, question)
+    
     async def _generate_sql_with_vanna_rag(self, question: str) -> str:
         """Generate SQL using real Vanna AI with RAG enhancement."""
         if not self._vanna_client:
             raise RuntimeError("Vanna AI client not available")
 
         try:
-            logger.info("🚀 Starting Vanna AI + RAG SQL generation...")
+            logger.debug("🚀 Starting Vanna AI + RAG SQL generation...")
 
             # Ensure RAG system is initialized
-            if not self._rag_initialized:
-                logger.info("🔧 Initializing RAG system...")
-                if hasattr(self, '_rag_system'):
-                    rag_success = await self._rag_system.initialize()
-                    self._rag_initialized = rag_success
-                    if rag_success:
-                        logger.info("✅ RAG system initialized successfully")
-                        # Train Vanna AI with schema from RAG
-                        self._train_vanna_model()
-                    else:
-                        logger.warning("⚠️ RAG system initialization failed")
+            await self._ensure_rag_initialized()
 
             # Get RAG-enhanced context for the question
             if self._rag_initialized and self._rag_system.is_available():
-                logger.info("📋 Retrieving RAG context for question...")
+                logger.debug("📋 Retrieving RAG context for question...")
                 enhanced_question = await self._rag_system.enhance_question(question)
-                logger.info(f"✨ RAG-enhanced question created ({len(enhanced_question)} chars)")
-                logger.info(f"📝 Enhanced question preview: {enhanced_question[:150]}...")
+                logger.debug("✨ RAG-enhanced question created ({} chars)", len(enhanced_question))
 
                 # Use Vanna AI with RAG-enhanced context
-                logger.info("🤖 Calling Vanna AI with enhanced context...")
-                result = self._vanna_client.ask(enhanced_question)
-                logger.info("✅ Vanna AI call completed")
+                logger.debug("🤖 Calling Vanna AI with enhanced context...")
+                result = await self._ask(enhanced_question)
+                logger.debug("✅ Vanna AI call completed")
             else:
                 # Fallback to original question if RAG is not available
                 logger.warning("⚠️ RAG not available, using original question")
-                result = self._vanna_client.ask(question)
+                result = await self._ask(question)
 
             # Handle Vanna AI response
-            logger.info(f"🔍 Processing Vanna AI response: {type(result)}")
+            logger.debug("🔍 Processing Vanna AI response: {}", type(result).__name__)
 
             if isinstance(result, str) and str(result).strip():
                 sql_query = str(result).strip()
-                logger.info(f"🎯 Generated SQL: {sql_query}")
+                logger.debug("🎯 Generated SQL: {}", sql_query)
                 return sql_query
             elif isinstance(result, tuple) and len(result) >= 1 and result[0] is not None:
                 sql_text = str(result[0]).strip()
                 if sql_text:
-                    logger.info(f"🎯 Generated SQL from tuple: {sql_text}")
+                    logger.debug("🎯 Generated SQL from tuple: {}", sql_text)
                     return sql_text
                 else:
                     raise RuntimeError(f"Vanna AI returned empty SQL in tuple: {result}")
@@ -278,13 +473,9 @@ class VannaClientRepository(VannaRepository):
             raise RuntimeError("RAG system not available")
 
         try:
-            # Get RAG-enhanced context
-            enhanced_question = await self._rag_system.enhance_question(question)
-            logger.info(f"🔍 RAG-enhanced question: {enhanced_question[:100]}...")
-
-            # Use basic pattern matching as fallback
+            # Use basic pattern matching as fallback; it only looks at the raw question
             sql_query = self._generate_sql_from_patterns(question)
-            logger.info(f"📝 RAG-generated SQL: {sql_query}")
+            logger.debug("📝 RAG-generated SQL: {}", sql_query)
             return sql_query.strip()
 
         except Exception as e:
@@ -294,22 +485,11 @@ class VannaClientRepository(VannaRepository):
     def _generate_sql_from_patterns(self, question: str) -> str:
         """Simple pattern matching fallback for basic queries."""
         question_lower = question.lower()
+        for needles, sql in _FALLBACK_RULES:
+            if all(needle in question_lower for needle in needles):
+                return sql
+        return _DEFAULT_FALLBACK_SQL
 
-        # Basic pattern matching for common queries
-        if "all employees" in question_lower:
-            return "SELECT * FROM employees"
-        elif "employees in engineering" in question_lower:
-            return "SELECT * FROM employees WHERE department = 'Engineering'"
-        elif "average salary" in question_lower:
-            return "SELECT department, AVG(salary) as average_salary FROM employees GROUP BY department"
-        elif "names start with" in question_lower and "j" in question_lower:
-            return "SELECT * FROM employees WHERE first_name LIKE 'J%'"
-        elif "all tables" in question_lower:
-            return "SELECT name FROM sqlite_master WHERE type='table'"
-        else:
-            # Default fallback
-            return "SELECT * FROM employees"
-    
     def _get_client(self) -> None:
         """Get the Vanna client (functional approach, no client object needed)."""
         # Vanna uses a functional approach, no client object to return
@@ -319,6 +499,9 @@ class VannaClientRepository(VannaRepository):
         """
         Generate SQL from natural language question using real Vanna AI + RAG.
         
+        Repeated questions are answered from an in-process LRU cache; concurrent
+        misses for the same question share a single generation.
+        
         Args:
             question: Natural language question
             
@@ -328,79 +511,92 @@ class VannaClientRepository(VannaRepository):
         Raises:
             RuntimeError: If SQL generation failed
         """
-        logger.info(f"🚀 VANNA: Starting real Vanna AI + RAG SQL generation")
-        logger.info(f"📝 Question: '{question}'")
-        logger.info(f"🔑 API Key set: {self._api_key_set}")
-        logger.info(f"📊 RAG System available: {self._rag_system.is_available() if self._rag_system else False}")
+        # Collapse whitespace only: case can matter (string literals compare case-sensitively)
+        cache_key = " ".join(question.split())
+        cached_sql = _sql_cache.get(cache_key)
+        if cached_sql is not None:
+            logger.debug("⚡ VANNA: SQL cache hit")
+            return cached_sql
+        
+        async with _sql_locks.hold(cache_key):
+            # Another coroutine may have filled the cache while we waited
+            cached_sql = _sql_cache.peek(cache_key)
+            if cached_sql is not None:
+                return cached_sql
+            
+            sql_query, from_vanna = await self._generate_sql_uncached(question)
+            # Only cache real Vanna AI answers, not the pattern-matching fallback
+            if from_vanna:
+                _sql_cache.set(cache_key, sql_query)
+            return sql_query
+    
+    def sql_cache_stats(self) -> Dict[str, int]:
+        """Return SQL generation cache statistics."""
+        return _sql_cache.stats()
+    
+    async def _generate_sql_uncached(self, question: str) -> Tuple[str, bool]:
+        """Generate SQL, returning (sql, generated_by_vanna)."""
+        logger.info("🚀 VANNA: Starting real Vanna AI + RAG SQL generation")
+        logger.debug("📝 Question: '{}'", question)
         
         # Check if Vanna AI client is available
         if not self._vanna_client or not self._api_key_set:
             raise RuntimeError("Vanna AI client not available - please check API key and model configuration")
         
         try:
-            logger.info("🎯 Starting Vanna AI + RAG SQL generation process...")
+            logger.debug("🎯 Starting Vanna AI + RAG SQL generation process...")
 
             # Initialize RAG system if not already done
-            if not self._rag_initialized:
-                logger.info("🔧 Initializing RAG system for context retrieval...")
-                if hasattr(self, '_rag_system'):
-                    rag_success = await self._rag_system.initialize()
-                    self._rag_initialized = rag_success
-                    if rag_success:
-                        logger.info("✅ RAG system initialized successfully")
-                        logger.info("📚 Training Vanna AI with database schema from RAG...")
-                        # Train Vanna AI with schema from RAG
-                        train_success = self._train_vanna_model()
-                        if train_success:
-                            logger.info("✅ Vanna AI training completed successfully")
-                        else:
-                            logger.warning("⚠️ Vanna AI training failed, but proceeding with generation")
-                    else:
-                        logger.error("❌ RAG system initialization failed")
-                        raise RuntimeError("Cannot proceed without RAG system - schema context is required")
-            else:
-                    raise RuntimeError("RAG system not available")
+            await self._ensure_rag_initialized()
 
             # Generate SQL using Vanna AI + RAG with fallback
-            logger.info("🚀 Generating SQL with Vanna AI + RAG...")
+            logger.debug("🚀 Generating SQL with Vanna AI + RAG...")
             try:
                 sql_query = await self._generate_sql_with_vanna_rag(question)
                 logger.info("✅ Vanna AI + RAG SQL generation completed successfully")
-                logger.info(f"🎯 Final SQL: '{sql_query}'")
-                return sql_query.strip()
+                logger.debug("🎯 Final SQL: '{}'", sql_query)
+                return sql_query.strip(), True
             except Exception as vanna_error:
                 logger.warning(f"⚠️ Vanna AI failed ({vanna_error}), falling back to RAG-only...")
                 # Fallback to RAG-only generation
                 sql_query = await self._generate_sql_with_rag_only(question)
                 logger.info("✅ RAG-only SQL generation completed successfully")
-                logger.info(f"🎯 Final SQL (fallback): '{sql_query}'")
-                return sql_query.strip()
+                logger.debug("🎯 Final SQL (fallback): '{}'", sql_query)
+                return sql_query.strip(), False
             
         except Exception as e:
             logger.error(f"❌ All SQL generation methods failed: {e}")
             raise RuntimeError(f"Failed to generate SQL: {e}")
     
     async def check_connection(self) -> bool:
-        """Check if Vanna AI is accessible."""
-        try:
-            if not self._initialized:
-                return False
+        """
+        Check if Vanna AI is accessible.
+        
+        The probe result is cached for _CONNECTION_TTL seconds, and concurrent
+        callers share a single in-flight probe.
+        """
+        if not self._initialized or not self._vanna_client or not self._api_key_set:
+            return False
+        
+        if time.monotonic() < self._conn_status_expires_at:
+            return self._conn_status
+        
+        async with self._conn_probe_lock:
+            # Another caller may have refreshed the status while we waited
+            if time.monotonic() < self._conn_status_expires_at:
+                return self._conn_status
             
-            # If we have a real client, try to check if Vanna is working
-            if self._vanna_client and self._api_key_set:
-                try:
-                    # Try a simple test call with real client
-                    loop = asyncio.get_event_loop()
-                    test_result = await loop.run_in_executor(
-                        None, 
-                        self._vanna_client.ask, 
-                        "test"
-                    )
-                    return bool(test_result)
-                except Exception:
-                    return False
-            else:
-                # No real client available
-                return False
-        except Exception:
-            return False
\ No newline at end of file
+            try:
+                loop = asyncio.get_running_loop()
+                test_result = await loop.run_in_executor(
+                    self._executor,
+                    self._vanna_client.ask,
+                    "test"
+                )
+                status = bool(test_result)
+            except Exception:
+                status = False
+            
+            self._conn_status = status
+            self._conn_status_expires_at = time.monotonic() + _CONNECTION_TTL
+            return status
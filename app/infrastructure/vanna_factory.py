@@ -2,10 +2,11 @@
 Factory for creating Vanna AI clients (local vs remote).
 """
 import os
+from functools import lru_cache
 from typing import Union
 
 from .vanna_client import VannaClientRepository
-from .local_vanna_client import LocalVannaClientRepository
+from .local_vanna_client import LocalVannaClientRepository, create_local_vanna_client
 from .config import settings
 from loguru import logger
 
@@ -25,11 +26,28 @@ def create_vanna_client(use_local: bool = None) -> Union[VannaClientRepository,
         use_local = settings.use_local_vanna
     
     if use_local:
-        logger.info("🏠 Creating LOCAL Vanna AI client")
-        return LocalVannaClientRepository()
+        # Shared instance, so its HTTP connection pool and RAG system are reused
+        return create_local_vanna_client()
     else:
-        logger.info("☁️ Creating REMOTE Vanna AI client")
-        return VannaClientRepository()
+        return _create_remote_vanna_client()
+
+
+@lru_cache(maxsize=1)
+def _create_remote_vanna_client() -> VannaClientRepository:
+    """Build the shared remote client once; its session, pool and RAG system are reused."""
+    logger.info("☁️ Creating REMOTE Vanna AI client")
+    return VannaClientRepository()
+
+
+def reset_clients() -> None:
+    """
+    Forget the cached local and remote clients so the next call builds new ones.
+    
+    Does not close them; call close_local_vanna_client() first when the local
+    client's HTTP pool should be released.
+    """
+    _create_remote_vanna_client.cache_clear()
+    create_local_vanna_client.cache_clear()
 
 
 def get_vanna_client_from_env() -> Union[VannaClientRepository, LocalVannaClientRepository]:
@@ -1,9 +1,11 @@
 """
 FastAPI application with all endpoints.
 """
+import asyncio
 import time
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
 from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
@@ -13,8 +15,10 @@ from loguru import logger
 
 from ..application.use_cases import HealthCheckUseCase, ProcessQueryUseCase
 # Domain entities imported as needed
-from ..infrastructure.database import db_manager, SQLiteDatabaseRepository
-from ..infrastructure.query_repository import InMemoryQueryRepository
+from ..infrastructure.config import settings
+from ..infrastructure.database import db_manager, db_repository
+from ..infrastructure.local_vanna_client import close_local_vanna_client, create_local_vanna_client
+from ..infrastructure.query_repository import query_repository
 from ..infrastructure.vanna_factory import get_vanna_client_from_env
 from .dto import (
     ErrorResponseDTO,
@@ -25,7 +29,10 @@ from .dto import (
 )
 
 # Application startup time
-STARTUP_TIME = time.time()
+STARTUP_TIME = time.monotonic()
+
+# Background warm-up of the shared local Vanna client, started at startup
+_local_vanna_warmup: Optional[asyncio.Task] = None
 
 
 def create_app() -> FastAPI:
@@ -87,9 +94,24 @@ async def startup_event() -> None:
         logger.error(f"   ❌ Failed to establish database connection: {e}")
         logger.error(f"   📋 Error type: {type(e).__name__}")
     
+    # Warm up the shared local Vanna client in the background so a slow or
+    # unreachable server never holds up startup; early requests share this init
+    if settings.use_local_vanna:
+        global _local_vanna_warmup
+        logger.info("   🏠 Initializing local Vanna client in the background...")
+        _local_vanna_warmup = asyncio.create_task(_warm_up_local_vanna())
+    
     logger.info("   🎉 Application startup completed successfully")
 
 
+async def _warm_up_local_vanna() -> None:
+    """Initialize the shared local Vanna client, logging the outcome."""
+    if await create_local_vanna_client().initialize():
+        logger.info("   ✅ Local Vanna client ready")
+    else:
+        logger.warning("   ⚠️  Local Vanna client not ready, will retry on first request")
+
+
 async def shutdown_event() -> None:
     """Application shutdown event handler."""
     logger.info("🛑 APPLICATION SHUTDOWN: Shutting down Vanna AI Web Application...")
@@ -103,6 +125,14 @@ async def shutdown_event() -> None:
     except Exception as e:
         logger.error(f"   ❌ Error during database cleanup: {e}")
     
+    # Stop a warm-up still in flight, then close the shared local Vanna client's HTTP pool
+    if _local_vanna_warmup is not None and not _local_vanna_warmup.done():
+        _local_vanna_warmup.cancel()
+    try:
+        await close_local_vanna_client()
+    except Exception as e:
+        logger.error(f"   ❌ Error closing local Vanna client: {e}")
+    
     logger.info("   🎉 Application shutdown completed successfully")
 
 
@@ -141,7 +171,7 @@ async def health_check() -> HealthResponseDTO:
     try:
         # Create repositories
         vanna_repo = get_vanna_client_from_env()
-        db_repo = SQLiteDatabaseRepository(db_manager)
+        db_repo = db_repository
         
         logger.info(f"   🔧 Repositories created successfully")
         
@@ -162,7 +192,7 @@ async def health_check() -> HealthResponseDTO:
         logger.info(f"   🤖 Vanna connected: {health_status.vanna_connected}")
         
         # Calculate uptime
-        uptime_seconds = time.time() - STARTUP_TIME
+        uptime_seconds = time.monotonic() - STARTUP_TIME
         
         response_dto = HealthResponseDTO(
             status=health_status.status,
@@ -171,6 +201,7 @@ async def health_check() -> HealthResponseDTO:
             database_connected=health_status.database_connected,
             vanna_connected=health_status.vanna_connected,
             uptime_seconds=uptime_seconds,
+            sql_cache=vanna_repo.sql_cache_stats() if hasattr(vanna_repo, 'sql_cache_stats') else None,
         )
         
         # Log response details
@@ -214,9 +245,9 @@ async def process_query(query_request: QueryRequestDTO) -> QueryResponseDTO:
     
     try:
         # Create repositories
-        query_repo = InMemoryQueryRepository()
+        query_repo = query_repository
         vanna_repo = get_vanna_client_from_env()
-        db_repo = SQLiteDatabaseRepository(db_manager)
+        db_repo = db_repository
         
         logger.info(f"   🔧 Repositories created successfully")
         
@@ -310,14 +341,14 @@ async def root() -> SuccessResponseDTO:
 async def get_rag_status():
     """Get RAG system status and capabilities."""
     try:
-        # Create a new Vanna client instance to check RAG status
+        # Shared Vanna client; its RAG system is reused across requests
         vanna_client = get_vanna_client_from_env()
         
-        # Initialize RAG system to get accurate status
-        if hasattr(vanna_client, '_rag_system') and vanna_client._rag_system:
-            import asyncio
+        # Load the RAG system once (under the client's init lock) to get accurate status;
+        # this never trains Vanna, so polling the endpoint writes nothing
+        if hasattr(vanna_client, '_rag_system') and not vanna_client._rag_system.is_available():
             try:
-                asyncio.run(vanna_client._rag_system.initialize())
+                await vanna_client._ensure_rag_system()
             except Exception as e:
                 logger.warning(f"RAG initialization failed: {e}")
         rag_available = False
@@ -34,6 +34,7 @@ class HealthResponseDTO(BaseModel):
     database_connected: bool = Field(..., description="Database connection status")
     vanna_connected: bool = Field(..., description="Vanna AI connection status")
     uptime_seconds: Optional[float] = Field(None, description="Application uptime in seconds")
+    sql_cache: Optional[Dict[str, int]] = Field(None, description="SQL generation cache statistics")
 
 
 class ErrorResponseDTO(BaseModel):
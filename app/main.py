@@ -14,12 +14,13 @@ def setup_logging() -> None:
     # Remove default logger
     logger.remove()
     
-    # Add console logger
+    # Add console logger (enqueue=True hands formatting and I/O to a background thread)
     logger.add(
         sys.stdout,
         format=settings.log_format,
         level=settings.log_level,
         colorize=True,
+        enqueue=True,
     )
     
     # Add file logger for production
@@ -34,6 +35,7 @@ def setup_logging() -> None:
             rotation="10 MB",
             retention="7 days",
             compression="zip",
+            enqueue=True,
         )
     
     logger.info("Logging configured successfully")
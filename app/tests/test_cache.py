@@ -0,0 +1,178 @@
+"""
+Tests for the in-process cache helpers.
+"""
+import asyncio
+
+import pytest
+
+from app.infrastructure import cache as cache_module
+from app.infrastructure.cache import KeyedLocks, LRUCache
+
+
+class FakeClock:
+    """Controllable stand-in for time.monotonic."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module.time, "monotonic", fake)
+    return fake
+
+
+class TestLRUCache:
+    def test_get_returns_stored_value_and_counts_hits(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.get("missing") is None
+        assert cache.stats() == {"size": 1, "maxsize": 2, "hits": 1, "misses": 1}
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" is now least recently used
+        cache.set("c", 3)
+
+        assert cache.peek("b") is None
+        assert cache.peek("a") == 1
+        assert cache.peek("c") == 3
+        assert len(cache) == 2
+
+    def test_peek_does_not_change_recency(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.peek("a")
+        cache.set("c", 3)
+
+        assert cache.peek("a") is None
+        assert cache.hits == 0 and cache.misses == 0
+
+    def test_entries_expire_after_ttl(self, clock):
+        cache = LRUCache(maxsize=2, ttl=10.0)
+        cache.set("a", 1)
+
+        clock.now += 9.9
+        assert cache.get("a") == 1
+
+        clock.now += 0.2
+        assert cache.get("a") is None
+        assert cache.peek("a") is None
+        assert len(cache) == 0
+        assert cache.misses == 1
+
+    def test_set_refreshes_ttl(self, clock):
+        cache = LRUCache(maxsize=2, ttl=10.0)
+        cache.set("a", 1)
+        clock.now += 8.0
+        cache.set("a", 2)
+        clock.now += 8.0
+
+        assert cache.get("a") == 2
+
+    def test_without_ttl_entries_never_expire(self, clock):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        clock.now += 10 ** 9
+
+        assert cache.get("a") == 1
+
+    def test_eviction_forgets_expiry(self, clock):
+        cache = LRUCache(maxsize=1, ttl=10.0)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        assert cache._expires_at.keys() == {"b"}
+
+    def test_clear(self, clock):
+        cache = LRUCache(maxsize=2, ttl=10.0)
+        cache.set("a", 1)
+        cache.clear()
+
+        assert len(cache) == 0
+        assert cache.get("a") is None
+
+
+class TestKeyedLocks:
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_generate_once(self):
+        cache: LRUCache[str, str] = LRUCache()
+        locks: KeyedLocks[str] = KeyedLocks()
+        calls = 0
+
+        async def generate(key: str) -> str:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+            async with locks.hold(key):
+                cached = cache.peek(key)
+                if cached is not None:
+                    return cached
+                nonlocal calls
+                calls += 1
+                await asyncio.sleep(0.01)
+                cache.set(key, f"sql for {key}")
+                return cache.peek(key)
+
+        results = await asyncio.gather(*(generate("q") for _ in range(5)), generate("other"))
+
+        assert results[:5] == ["sql for q"] * 5
+        assert results[5] == "sql for other"
+        assert calls == 2
+        assert len(locks) == 0
+
+    @pytest.mark.asyncio
+    async def test_lock_is_kept_while_coroutines_wait(self):
+        locks: KeyedLocks[str] = KeyedLocks()
+        gate = asyncio.Event()
+        inside = 0
+        max_inside = 0
+        late_tasks = []
+
+        async def critical() -> None:
+            nonlocal inside, max_inside
+            async with locks.hold("k"):
+                inside += 1
+                max_inside = max(max_inside, inside)
+                await asyncio.sleep(0)
+                inside -= 1
+
+        async def first() -> None:
+            async with locks.hold("k"):
+                await gate.wait()
+            # The queued waiter has been woken but has not run yet; a caller
+            # arriving now must still queue on the same lock
+            assert len(locks) == 1
+            late_tasks.append(asyncio.create_task(critical()))
+
+        first_task = asyncio.create_task(first())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(critical())
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(first_task, waiter)
+        await asyncio.gather(*late_tasks)
+
+        assert max_inside == 1
+        assert len(locks) == 0
+
+    @pytest.mark.asyncio
+    async def test_lock_released_on_error(self):
+        locks: KeyedLocks[str] = KeyedLocks()
+
+        with pytest.raises(RuntimeError):
+            async with locks.hold("k"):
+                raise RuntimeError("boom")
+
+        assert len(locks) == 0
+        async with locks.hold("k"):
+            pass
@@ -0,0 +1,117 @@
+"""
+Tests for the SQLite database manager and repository.
+"""
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from app.infrastructure.database import DatabaseManager, SQLiteDatabaseRepository
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "test.db")
+    monkeypatch.setattr(DatabaseManager, "_get_db_path", lambda self: path)
+    return path
+
+
+@pytest.fixture
+def manager(db_path):
+    manager = DatabaseManager()
+    asyncio.run(manager.initialize_database())
+    yield manager
+    manager.close()
+
+
+def _count_users(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _in_thread(func):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+class TestConnectionCache:
+    def test_connection_is_reused_within_a_thread(self, manager):
+        assert manager.get_read_connection() is manager.get_read_connection()
+
+    def test_each_thread_gets_its_own_connection(self, manager):
+        main_conn = manager.get_read_connection()
+        other_conn = _in_thread(manager.get_read_connection)
+
+        assert other_conn is not main_conn
+        assert _in_thread(manager.get_read_connection) is not other_conn
+
+    def test_close_closes_every_cached_connection(self, manager):
+        main_conn = manager.get_read_connection()
+        other_conn = _in_thread(manager.get_read_connection)
+
+        manager.close()
+
+        for conn in (main_conn, other_conn):
+            with pytest.raises(Exception, match="closed"):
+                conn.execute("SELECT 1")
+        assert manager.get_read_connection() is not main_conn
+
+    @pytest.mark.asyncio
+    async def test_execute_query_returns_rows_as_dicts(self, manager):
+        repo = SQLiteDatabaseRepository(manager)
+
+        results, elapsed_ms = await repo.execute_query("SELECT username FROM users ORDER BY id LIMIT 2")
+
+        assert results == [{"username": "john_doe"}, {"username": "jane_smith"}]
+        assert elapsed_ms >= 0
+
+
+class TestInitialization:
+    def test_initializing_again_does_not_reseed(self, manager, db_path):
+        asyncio.run(DatabaseManager().initialize_database())
+
+        assert _count_users(db_path) == 5
+
+    def test_existing_data_survives_initialization(self, manager, db_path):
+        conn = sqlite3.connect(db_path)
+        with conn:
+            conn.execute("INSERT INTO users (username, email) VALUES ('extra', 'extra@example.com')")
+        conn.close()
+
+        asyncio.run(DatabaseManager().initialize_database())
+
+        assert _count_users(db_path) == 6
+
+    def test_reset_recreates_the_database(self, manager, db_path):
+        conn = sqlite3.connect(db_path)
+        with conn:
+            conn.execute("DELETE FROM users")
+        conn.close()
+
+        asyncio.run(manager.initialize_database(reset=True))
+
+        assert _count_users(db_path) == 5
+
+
+class TestReadOnlyConnections:
+    def test_read_connection_rejects_writes(self, manager):
+        conn = manager.get_read_connection()
+
+        with pytest.raises(sqlite3.OperationalError, match="readonly"):
+            conn.execute("DELETE FROM users")
+
+    @pytest.mark.asyncio
+    async def test_execute_query_rejects_generated_writes(self, manager, db_path):
+        repo = SQLiteDatabaseRepository(manager)
+
+        with pytest.raises(Exception, match="readonly"):
+            await repo.execute_query("DROP TABLE users")
+
+        assert _count_users(db_path) == 5
@@ -0,0 +1,188 @@
+"""
+Tests for the local Vanna client's HTTP retry policy.
+"""
+import httpx
+import pytest
+
+pytest.importorskip("qdrant_client")
+
+from app.infrastructure import local_vanna_client as lvc  # noqa: E402
+from app.infrastructure.local_vanna_client import LocalVannaClientRepository  # noqa: E402
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record backoff delays instead of sleeping."""
+    delays = []
+
+    async def fake_sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(lvc.asyncio, "sleep", fake_sleep)
+    return delays
+
+
+@pytest.fixture
+def jitter(monkeypatch):
+    """Make the jittered delay deterministic: always the lower bound."""
+    bounds = []
+
+    def fake_uniform(low, high):
+        bounds.append((low, high))
+        return low
+
+    monkeypatch.setattr(lvc.random, "uniform", fake_uniform)
+    return bounds
+
+
+def _client(responses):
+    """Build a client whose transport replays responses (or raises exceptions) in order."""
+    requests = []
+    replies = iter(responses)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        reply = next(replies)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    client = LocalVannaClientRepository()
+    client._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client, requests
+
+
+@pytest.mark.asyncio
+async def test_503_waits_for_retry_after_then_succeeds(sleeps, jitter):
+    client, requests = _client([
+        httpx.Response(503, headers={"Retry-After": "5"}),
+        httpx.Response(200, json={"status": "healthy"}),
+    ])
+
+    result = await client._make_request("/health", retries=3)
+
+    assert result == {"status": "healthy"}
+    assert len(requests) == 2
+    # Jitter alone would wait 1s; Retry-After raises it to 5s
+    assert sleeps == [5.0]
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_capped(sleeps, jitter):
+    client, requests = _client([
+        httpx.Response(503, headers={"Retry-After": "3600"}),
+        httpx.Response(200, json={}),
+    ])
+
+    await client._make_request("/health", retries=1)
+
+    assert sleeps == [lvc._RETRY_MAX_DELAY]
+
+
+@pytest.mark.asyncio
+async def test_post_server_error_is_not_retried(sleeps, jitter):
+    client, requests = _client([httpx.Response(500)])
+
+    with pytest.raises(Exception, match="Server error after 1 attempts: 500"):
+        await client._make_request("/train", method="POST", data={"question": "q"}, retries=3)
+
+    assert len(requests) == 1
+    assert sleeps == []
+
+
+@pytest.mark.asyncio
+async def test_post_read_timeout_is_not_retried(sleeps, jitter):
+    client, requests = _client([httpx.ReadTimeout("slow")])
+
+    with pytest.raises(Exception, match="Request timeout after 1 attempts"):
+        await client._make_request("/train", method="POST", data={"question": "q"}, retries=3)
+
+    assert len(requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_post_is_retried_when_the_server_never_saw_it(sleeps, jitter):
+    client, requests = _client([
+        httpx.ConnectError("refused"),
+        httpx.Response(503),
+        httpx.Response(200, json={"ok": True}),
+    ])
+
+    result = await client._make_request("/train", method="POST", data={"question": "q"}, retries=3)
+
+    assert result == {"ok": True}
+    assert len(requests) == 3
+    assert requests[0].content == b'{"question":"q"}'
+
+
+@pytest.mark.asyncio
+async def test_idempotent_post_is_retried_on_server_error(sleeps, jitter):
+    client, requests = _client([httpx.Response(500), httpx.Response(200, json={"sql": "SELECT 1"})])
+
+    result = await client._make_request(
+        "/generate_sql", method="POST", data={"question": "q"}, retries=1, idempotent=True
+    )
+
+    assert result == {"sql": "SELECT 1"}
+    assert len(requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_retries_run_out(sleeps, jitter):
+    client, requests = _client([httpx.Response(502)] * 3)
+
+    with pytest.raises(Exception, match="Server error after 3 attempts: 502"):
+        await client._make_request("/health", retries=2)
+
+    assert len(requests) == 3
+    # No sleep after the final attempt
+    assert len(sleeps) == 2
+
+
+@pytest.mark.asyncio
+async def test_backoff_uses_decorrelated_jitter(sleeps, monkeypatch):
+    bounds = []
+
+    def fake_uniform(low, high):
+        bounds.append((low, high))
+        return high
+
+    monkeypatch.setattr(lvc.random, "uniform", fake_uniform)
+    client, _ = _client([httpx.ConnectError("refused")] * 5)
+
+    with pytest.raises(Exception, match="Request failed after 5 attempts"):
+        await client._make_request("/health", retries=4)
+
+    # Each upper bound is three times the previous delay, capped at the maximum
+    assert bounds == [(1.0, 3.0), (1.0, 9.0), (1.0, 27.0), (1.0, 81.0)]
+    assert sleeps == [3.0, 9.0, 27.0, lvc._RETRY_MAX_DELAY]
+
+
+@pytest.mark.asyncio
+async def test_client_error_is_not_retried(sleeps, jitter):
+    client, requests = _client([httpx.Response(404, text="missing")])
+
+    with pytest.raises(Exception, match="Client error: 404 - missing"):
+        await client._make_request("/health", retries=3)
+
+    assert len(requests) == 1
+    assert sleeps == []
+
+
+@pytest.mark.asyncio
+async def test_server_error_clears_cached_health(sleeps, jitter):
+    client, _ = _client([httpx.Response(500)])
+    client._health_expires_at = float("inf")
+
+    with pytest.raises(Exception):
+        await client._make_request("/health", retries=0)
+
+    assert client._health_expires_at == 0.0
+
+
+def test_parse_retry_after():
+    assert lvc._parse_retry_after("7") == 7.0
+    assert lvc._parse_retry_after("-3") == 0.0
+    assert lvc._parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert lvc._parse_retry_after("garbage") is None
+    assert lvc._parse_retry_after(None) is None
@@ -0,0 +1,88 @@
+"""
+Tests for the in-memory query repository.
+"""
+import pytest
+
+from app.domain.entities import QueryRequest, QueryResponse
+from app.infrastructure.query_repository import InMemoryQueryRepository
+
+
+def _response(sql: str = "SELECT 1") -> QueryResponse:
+    return QueryResponse(sql_query=sql, results=[], execution_time_ms=1.0, row_count=0)
+
+
+async def _collect(iterator):
+    return [item async for item in iterator]
+
+
+@pytest.mark.asyncio
+async def test_save_and_get_query_and_response():
+    repo = InMemoryQueryRepository()
+    query = QueryRequest(question="Show me all users")
+
+    query_id = await repo.save_query(query)
+    await repo.save_response(query_id, _response())
+
+    assert await repo.get_query_by_id(query_id) is query
+    assert (await repo.get_response_by_id(query_id)).sql_query == "SELECT 1"
+
+
+@pytest.mark.asyncio
+async def test_unknown_or_malformed_ids_return_none():
+    repo = InMemoryQueryRepository()
+
+    assert await repo.get_query_by_id("42") is None
+    assert await repo.get_query_by_id("not-a-number") is None
+    assert await repo.get_response_by_id("not-a-number") is None
+
+
+@pytest.mark.asyncio
+async def test_save_response_rejects_malformed_id():
+    repo = InMemoryQueryRepository()
+
+    with pytest.raises(ValueError):
+        await repo.save_response("not-a-number", _response())
+
+
+@pytest.mark.asyncio
+async def test_ids_are_sequential_strings():
+    repo = InMemoryQueryRepository()
+
+    assert [await repo.save_query(QueryRequest(question=q)) for q in ("a", "b")] == ["1", "2"]
+
+
+@pytest.mark.asyncio
+async def test_cap_evicts_least_recently_used_query_and_its_response():
+    repo = InMemoryQueryRepository(max_entries=2)
+    first = await repo.save_query(QueryRequest(question="first"))
+    await repo.save_response(first, _response())
+    second = await repo.save_query(QueryRequest(question="second"))
+    third = await repo.save_query(QueryRequest(question="third"))
+
+    assert await repo.get_query_by_id(first) is None
+    assert await repo.get_response_by_id(first) is None
+    assert [qid for qid, _ in await _collect(repo.get_all_queries())] == [second, third]
+
+
+@pytest.mark.asyncio
+async def test_lookup_refreshes_recency():
+    repo = InMemoryQueryRepository(max_entries=2)
+    first = await repo.save_query(QueryRequest(question="first"))
+    second = await repo.save_query(QueryRequest(question="second"))
+    await repo.get_query_by_id(first)
+    await repo.save_query(QueryRequest(question="third"))
+
+    assert await repo.get_query_by_id(first) is not None
+    assert await repo.get_query_by_id(second) is None
+
+
+@pytest.mark.asyncio
+async def test_response_for_evicted_query_is_dropped():
+    repo = InMemoryQueryRepository(max_entries=1)
+    first = await repo.save_query(QueryRequest(question="first"))
+    await repo.save_query(QueryRequest(question="second"))
+
+    await repo.save_response(first, _response())
+
+    assert await repo.get_response_by_id(first) is None
+    assert await _collect(repo.get_all_responses()) == []